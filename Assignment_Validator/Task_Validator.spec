@@ -1,31 +1,28 @@
 # -*- mode: python ; coding: utf-8 -*-
-from PyInstaller.utils.hooks import collect_all
+from PyInstaller.utils.hooks import collect_submodules
 
-datas = [('src/consoles', 'consoles')]
-binaries = []
-hiddenimports = ['consoles', 'consoles.ClaudeConsole', 'consoles.DeepConsole', 'consoles.Helper', 'requests', 'rich', 'PyPDF2', 'dotenv']
-tmp_ret = collect_all('consoles')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
-tmp_ret = collect_all('requests')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
-tmp_ret = collect_all('rich')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
-tmp_ret = collect_all('PyPDF2')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
-tmp_ret = collect_all('dotenv')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
+# Only the modules main.py reaches are bundled. The analysis also follows the
+# imports inside functions, so the connectors and PyPDF2 that main.py loads
+# lazily are still found through pathex. rich picks its unicode width tables
+# by name at runtime, so those are the one package collected whole.
+hiddenimports = ['consoles.ClaudeConsole', 'consoles.DeepConsole', 'consoles.Helper', 'consoles.Answers', 'consoles.HttpPool', 'consoles.Providers', 'consoles.ResponseCache', 'consoles.RateLimiter', 'consoles.Metrics', 'consoles.StructuredOutput']
+hiddenimports += collect_submodules('rich._unicode_data')
+
+# Never imported by the validator, but reachable through optional imports
+excludes = ['tkinter', 'unittest', 'pydoc', 'doctest', 'pdb', 'lib2to3', 'xmlrpc', 'IPython', 'numpy', 'pandas',
+            'pyarrow', 'PIL']
 
 
 a = Analysis(
     ['main.py'],
-    pathex=[],
-    binaries=binaries,
-    datas=datas,
+    pathex=['src'],
+    binaries=[],
+    datas=[],
     hiddenimports=hiddenimports,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=excludes,
     noarchive=False,
     optimize=0,
 )
@@ -41,7 +38,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,      # UPX-packed libraries are decompressed again on every start
     upx_exclude=[],
     runtime_tmpdir=None,
     console=True,
@@ -1,5 +1,11 @@
 import sys
 import os
+import argparse
+import glob
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from rich.console import Console
 from rich.table import Table
 from rich.text import Text
@@ -7,9 +13,11 @@ from rich.prompt import Prompt, Confirm
 import rich.box
 from dotenv import load_dotenv
 
-from consoles import ClaudeConsole
-from consoles import DeepConsole
+from consoles import Answers
 from consoles import Helper
+from consoles import Metrics
+from consoles import ResponseCache
+from consoles import StructuredOutput
 
 # Find .env in multiple locations
 if getattr(sys, 'frozen', False):
@@ -22,10 +30,118 @@ load_dotenv()
 
 DEEP_API_KEY = os.getenv("DEEP_API_KEY")
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
+JSON_ANSWERS = False    # ask for answer sets as JSON (--json)
+CONSENSUS_MEMBERS = []  # (label, provider) pairs answering in --consensus mode
+QUORUM = 2              # members that must agree on an answer in --consensus mode
+
+# The connectors (and requests under them) are imported by load_connectors()
+# when the first validation starts, so the header and prompts show at once
+ClaudeConsole = None
+DeepConsole = None
+Providers = None
+_connectors_lock = threading.Lock()
 
 helper = Helper.Helper()
 console = Console()
+_worker = threading.local()     # batch workers swap in a silent console
+
+
+def out():
+    """Console for the current thread; batch workers validate silently."""
+    return getattr(_worker, "console", console)
+
+
+def load_connectors():
+    """Imports and sets up the provider connectors once; safe to call from every worker."""
+    global ClaudeConsole, DeepConsole, Providers
+    with _connectors_lock:
+        if ClaudeConsole is not None:
+            return
+
+        from consoles import ClaudeConsole as claude_console
+        from consoles import DeepConsole as deep_console
+        from consoles import HttpPool
+        from consoles import Providers as providers
+
+        # One keep-alive pool per provider, reused by every validation attempt
+        for provider in ("claude", "deepseek"):
+            HttpPool.configure(
+                provider,
+                pool_size=int(os.getenv("LLM_POOL_SIZE", HttpPool.DEFAULT_POOL_SIZE)),
+                read_timeout=float(os.getenv("LLM_TIMEOUT", HttpPool.DEFAULT_READ_TIMEOUT)),
+            )
+
+        # CLAUDE_BASE_URL / DEEPSEEK_BASE_URL point a provider elsewhere, e.g. at
+        # the benchmark mock server
+        for provider_class in (providers.ClaudeProvider, providers.DeepSeekProvider):
+            if os.getenv(f"{provider_class.name.upper()}_BASE_URL"):
+                provider_class.base_url = os.getenv(f"{provider_class.name.upper()}_BASE_URL").rstrip("/")
+
+        Providers = providers
+        DeepConsole = deep_console
+        ClaudeConsole = claude_console
+
 
+def build_consensus_members(spec):
+    """
+    Creates the providers for --consensus from a comma list of "Provider" or
+    "Provider:model" entries, e.g. "Claude,DeepSeek,Claude:claude-haiku-4-5".
+
+    Returns:
+        list: (label, provider) pairs; raises ValueError on a bad entry
+    """
+    load_connectors()
+    api_keys = {"claude": CLAUDE_API_KEY, "deepseek": DEEP_API_KEY}
+    members = []
+    for entry in (part.strip() for part in spec.split(",")):
+        if not entry:
+            continue
+        name, _, model = entry.partition(":")
+        try:
+            provider_class = Providers.get_provider_class(name.strip())
+        except KeyError as e:
+            raise ValueError(e.args[0])
+        api_key = api_keys.get(provider_class.name) or os.getenv(provider_class.api_key_env)
+        if not api_key:
+            raise ValueError(f"No API key for {provider_class.label}")
+        
+        label = f"{provider_class.label} ({model.strip()})" if model.strip() else provider_class.label
+        if any(existing == label for existing, _ in members):
+            label = f"{label} #{sum(existing.startswith(label) for existing, _ in members) + 1}"
+        members.append((label, provider_class(api_key, model=model.strip() or None)))
+    
+    if len(members) < 2:
+        raise ValueError("--consensus needs at least two models")
+    return members
+
+
+
+def parse_args():
+    """Reads optional command-line switches; anything unknown is ignored."""
+    parser = argparse.ArgumentParser(description="Assignment Validator")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true",
+                        help="do not read or write cached LLM responses or PDF text")
+    parser.add_argument("--refresh-cache", dest="refresh_cache", action="store_true",
+                        help="ignore cached responses but store the new ones")
+    parser.add_argument("--cache-path", dest="cache_path", default=ResponseCache.DEFAULT_PATH,
+                        help="SQLite response cache file")
+    parser.add_argument("--batch", dest="batch", default=None,
+                        help="validate every .pdf/.txt in a directory or matching a glob, without prompts")
+    parser.add_argument("--workers", dest="workers", type=int, default=4,
+                        help="files validated at once in --batch mode")
+    parser.add_argument("--max-retries", dest="max_retries", type=int, default=3,
+                        help="validation attempts per file")
+    parser.add_argument("--json", dest="json_answers", action="store_true",
+                        help="ask for answers as schema-checked JSON, repaired locally when malformed")
+    parser.add_argument("--consensus", dest="consensus", default=None,
+                        help='comma list of models, e.g. "Claude,DeepSeek,Claude:claude-haiku-4-5"; an answer '
+                             'is verified once --quorum of them agree')
+    parser.add_argument("--quorum", dest="quorum", type=int, default=None,
+                        help="models that must agree in --consensus mode (default: a majority)")
+    parser.add_argument("--metrics-out", dest="metrics_out", default=None,
+                        help="append per-call latency, token and cost metrics to this JSON lines file")
+    args, _ = parser.parse_known_args()
+    return args
 
 
 def get_input_file():
@@ -96,25 +212,60 @@ def display_pricing_table():
     table.add_column("Output", justify="right")
     table.add_column("Status", justify="center")
 
-    table.add_row("ChatGPT", "$0.25", "$0.025", "$2.00", "[green]● ONLINE[/green]")
-    table.add_row("DeepSeek", "$0.28", "$0.028", "$0.42", "[green]● ONLINE[/green]")
-    table.add_row("Claude", "$0.10-$5.00", "—", "$1.25-$2.00", "[green]● ONLINE[/green]")
+    def price(rate):
+        if rate is None:
+            return "—"
+        low, high = (f"${value:.3f}".rstrip("0") if round(value, 2) != value else f"${value:.2f}" for value in rate)
+        return low if low == high else f"{low}-{high}"
+
+    for rates in Metrics.PRICING.values():
+        table.add_row(rates["label"], price(rates["input"]), price(rates["cached_input"]), price(rates["output"]),
+                      "[green]● ONLINE[/green]")
 
     console.print(table)
 
 
+def display_metrics(metrics_out=None):
+    """Prints the per-provider call summary and closes the --metrics-out file, if any."""
+    summary = Metrics.summary()
+    if summary:
+        console.print(f"\n[dim]{summary}[/dim]")
+    if JSON_ANSWERS:
+        console.print(f"[dim]{StructuredOutput.summary()}[/dim]")
+    if metrics_out:
+        Metrics.close_jsonl()
+        console.print(f"[dim]Per-call metrics written to {metrics_out}[/dim]")
+
+
 # ============ PROMPT BUILDERS ============
 
+def build_answer_system(preamble=""):
+    """
+    Builds the instructions shared by every answer prompt of an assignment.
+    They are sent as a cacheable system block, so chunks and retries only
+    pay the full input rate for their own questions.
+    """
+    if JSON_ANSWERS:
+        system = ("Answer the questions you are given. Provide clear, concise answers, one entry per "
+                  "question, using the original question numbers.\n\n"
+                  + StructuredOutput.schema_instructions(StructuredOutput.ANSWER_SCHEMA))
+    else:
+        system = """Answer the questions you are given. Provide clear, concise answers.
+
+Format your response as one line per question, using the original question numbers:
+Q1: [answer]
+Q2: [answer]
+... and so on."""
+    if preamble:
+        system += f"\n\nAssignment instructions:\n{preamble}"
+    return system
+
+
 def build_question_prompt(question_text):
     """Builds prompt to send to LLMs for answering questions."""
-    prompt = f"""Answer the following questions. Provide clear, concise answers.
+    prompt = f"""Answer the following questions.
 
 {question_text}
-
-Format your response as:
-Q1: [answer]
-Q2: [answer]
-... and so on.
 """
     return prompt
 
@@ -134,69 +285,317 @@ Respond with ONLY "true" if they match, or "false" if they don't match.
     return prompt
 
 
-# ============ RESPONSE EXTRACTORS ============
+def build_retry_prompt(question_text, questions, numbers):
+    """
+    Builds prompt that re-asks only the given question numbers. When the
+    assignment could be split into numbered questions only their text is sent
+    (the preamble goes in the system block); otherwise the whole document goes
+    along with the list of numbers.
+    """
+    if all(number in questions for number in numbers):
+        body = "\n\n".join(questions[number] for number in numbers)
+    else:
+        body = question_text
+    
+    wanted = ", ".join(f"Q{number}" for number in numbers)
+    if JSON_ANSWERS:
+        layout = f"Give one entry per question, with these question numbers: {', '.join(map(str, numbers))}"
+    else:
+        layout = ("Format your response as one line per question, using the original numbers:\n"
+                  + "\n".join(f"Q{number}: [answer]" for number in numbers))
+    prompt = f"""Answer ONLY these questions: {wanted}.
+
+{body}
+
+{layout}
+"""
+    return prompt
 
-def extract_claude_response(result):
-    """Extracts text from Claude API response."""
-    if result and "content" in result:
-        return result["content"][0]["text"]
-    return None
 
+def build_question_validation_prompt(answer_1, answer_2):
+    """Builds prompt asking for a match verdict on every question separately."""
+    prompt = f"""Compare these two answer sets question by question. Do the answers to each question match in meaning (not necessarily word-for-word)?
 
-def extract_deepseek_response(result):
-    """Extracts text from DeepSeek API response."""
-    if result and "choices" in result:
-        return result["choices"][0]["message"]["content"]
-    return None
+Answer Set 1:
+{answer_1}
+
+Answer Set 2:
+{answer_2}
+
+Respond with one line per question in the form "Q1: true" or "Q1: false", and nothing else.
+"""
+    return prompt
 
 
 # ============ VALIDATION LOGIC ============
 
-def validate_answers(question_text, max_retries=3):
-    """Main validation logic with retry."""
+OFF_FORMAT_LIMIT = 2000    # characters streamed without a Q1: line before giving up
+CHUNK_MAX_CHARS = 24000    # question text per prompt (~6k tokens, well inside both context windows)
+CHUNK_MAX_QUESTIONS = 20   # answers per prompt that fit the 4000-token response budget
+CHUNK_WORKERS = 4          # chunks streamed at once per model
+
+
+def stream_answer(stream, progress, label, cancel=None):
+    """
+    Reads a streamed answer into text while recording progress for the
+    spinner. A stream that runs OFF_FORMAT_LIMIT characters without a single
+    Q1:-style line is cancelled, since it cannot be compared per question; in
+    JSON mode a reply that does not open with a JSON value is cancelled at once.
+    Setting the cancel event stops the stream at its next delta.
+
+    Returns:
+        str: The full answer, or None if the call failed or was cancelled
+    """
+    parts = []
+    received = 0
+    next_check = 0
+    scanner = StructuredOutput.StreamScanner() if JSON_ANSWERS else None
+    progress[label] = "waiting for first token"
+    
+    try:
+        for delta in stream:
+            if cancel is not None and cancel.is_set():
+                stream.close()
+                progress[label] = "cancelled, quorum reached"
+                return None
+            parts.append(delta)
+            received += len(delta)
+            
+            if scanner is not None:
+                # the scanner only looks at the new delta, so it runs on every one
+                scanner.feed(delta)
+                if scanner.off_format:
+                    stream.close()
+                    progress[label] = "cancelled, response is not JSON"
+                    return None
+                progress[label] = f"{scanner.items} answers ({received} chars)"
+            elif received >= next_check:
+                answered = len(Answers.parse_answers("".join(parts)))
+                if not answered and received >= OFF_FORMAT_LIMIT:
+                    stream.close()
+                    progress[label] = "cancelled, response is off-format"
+                    return None
+                progress[label] = f"Q{answered} ({received} chars)" if answered else f"{received} chars"
+                next_check = received + 200
+    except Exception as e:
+        # a cancelled stream may fail mid-read once its connection is closed
+        progress[label] = "cancelled, quorum reached" if cancel is not None and cancel.is_set() else f"error: {e}"
+        return None
+    
+    progress[label] = "done"
+    return "".join(parts)
+
+
+def build_chunk_prompts(question_text, preamble, questions, numbers=None):
+    """
+    Builds the answer prompts for one attempt. An assignment too long for one
+    response budget is split into question-aligned chunks answered
+    separately; numbers limits the prompts to those questions (a retry).
+
+    Returns:
+        tuple: (system block shared by the prompts, prompts in question order)
+    """
+    if numbers is None:
+        fits = len(question_text) <= CHUNK_MAX_CHARS and len(questions) <= CHUNK_MAX_QUESTIONS
+        if fits or not questions:
+            return build_answer_system(), [build_question_prompt(question_text)]
+        numbers = list(questions)
+    
+    if not all(number in questions for number in numbers):
+        return build_answer_system(), [build_retry_prompt(question_text, questions, numbers)]
+    
+    chunks = Answers.chunk_questions(questions, numbers, CHUNK_MAX_CHARS, CHUNK_MAX_QUESTIONS)
+    return (build_answer_system(preamble),
+            [build_retry_prompt(question_text, questions, chunk) for chunk in chunks])
+
+
+def ask_both(prompts, use_cache=True, system=None):
+    """
+    Streams every chunk prompt to Claude and DeepSeek at once; returns both
+    models' chunk answer texts in question order (None for a model whose
+    chunks did not all arrive).
+    """
+    
+    # The answer calls are independent, so an attempt costs the slowest call
+    # instead of their sum; streaming shows progress from the first token
+    # instead of a silent spinner
+    progress = {}
+    chunked = len(prompts) > 1
+    if chunked:
+        out().print(f"[dim]  Answering in {len(prompts)} chunks[/dim]")
+    
+    def label(model, index):
+        return f"{model} {index + 1}/{len(prompts)}" if chunked else model
     
+    def show():
+        if not chunked:
+            return " · ".join(f"{name}: {state}" for name, state in progress.items())
+        return " · ".join(
+            f"{model}: {sum(progress.get(label(model, i)) == 'done' for i in range(len(prompts)))}"
+            f"/{len(prompts)} chunks"
+            for model in ("Claude", "DeepSeek"))
+    
+    with out().status("[bold blue]  Processing with Claude and DeepSeek...[/bold blue]", spinner="dots") as status:
+        with ThreadPoolExecutor(max_workers=2 * min(len(prompts), CHUNK_WORKERS)) as executor:
+            claude_futures = [
+                executor.submit(
+                    stream_answer,
+                    ClaudeConsole.Claude_Stream(CLAUDE_API_KEY, prompt=prompt, use_cache=use_cache, system=system),
+                    progress, label("Claude", i))
+                for i, prompt in enumerate(prompts)
+            ]
+            deep_futures = [
+                executor.submit(
+                    stream_answer,
+                    DeepConsole.DeepSeek_Stream(DEEP_API_KEY, prompt=prompt, use_cache=use_cache, system=system),
+                    progress, label("DeepSeek", i))
+                for i, prompt in enumerate(prompts)
+            ]
+            
+            futures = claude_futures + deep_futures
+            while not all(future.done() for future in futures):
+                wait(futures, timeout=0.2)
+                status.update("[bold blue]  " + show() + "[/bold blue]")
+        
+        claude_parts = [future.result() for future in claude_futures]
+        deep_parts = [future.result() for future in deep_futures]
+    
+    # Each chunk keeps the original question numbers, so the chunk answers
+    # parsed in order make one Q1..Qn set; a missing chunk fails the model
+    claude_answer = claude_parts if all(claude_parts) else None
+    deep_answer = deep_parts if all(deep_parts) else None
+    
+    for model, answer, parts in (("Claude", claude_answer, claude_parts), ("DeepSeek", deep_answer, deep_parts)):
+        if answer:
+            out().print(f"[green]✓[/green] {model} response received")
+        else:
+            failed = [label(model, i) for i, part in enumerate(parts) if not part]
+            out().print(f"[red]✗[/red] {model} response failed "
+                        f"({'; '.join(f'{name}: {progress.get(name)}' for name in failed)})")
+    
+    return claude_answer, deep_answer
+
+
+def ask_judge(prompt, use_cache=True):
+    """Sends a comparison prompt to DeepSeek as validator; returns its reply text."""
+    with out().status("[bold blue]  Validating answers...[/bold blue]", spinner="dots"):
+        validation_result = DeepConsole.DeepSeek_Connect(DEEP_API_KEY, prompt=prompt, use_cache=use_cache)
+        validation_answer = DeepConsole.extract_response(validation_result)
+    out().print("[green]✓[/green] Validation complete")
+    return validation_answer
+
+
+def find_disagreements(claude_parsed, deep_parsed, use_cache=True):
+    """
+    Compares two parsed answer sets locally; only questions that stay
+    ambiguous are sent to the judge, one verdict per question.
+
+    Returns:
+        list: Question numbers the two models disagree on
+    """
+    verdicts = Answers.compare_answer_sets(claude_parsed, deep_parsed)
+    ambiguous = [number for number, verdict in verdicts.items() if verdict == Answers.AMBIGUOUS]
+    mismatched = [number for number, verdict in verdicts.items() if verdict == Answers.MISMATCH]
+    
+    out().print(f"[dim]  Local check: {len(verdicts) - len(ambiguous) - len(mismatched)} match, "
+                  f"{len(mismatched)} differ, {len(ambiguous)} need the judge[/dim]")
+    
+    if ambiguous:
+        validation_prompt = build_question_validation_prompt(
+            Answers.format_answers({number: claude_parsed[number] for number in ambiguous}),
+            Answers.format_answers({number: deep_parsed[number] for number in ambiguous}),
+        )
+        judged = Answers.parse_answers(ask_judge(validation_prompt, use_cache))
+        for number in ambiguous:
+            # anything the judge did not clearly call a match is retried
+            if Answers.normalize(judged.get(number, "")) != "true":
+                mismatched.append(number)
+    
+    return sorted(mismatched)
+
+
+def validate_answers(question_text, max_retries=3):
+    """
+    Main validation logic with retry. The first attempt answers the whole
+    assignment (in chunks if it is long); later attempts re-ask only the questions still in dispute and
+    merge the new answers into the key.
+    """
+    load_connectors()
+    if CONSENSUS_MEMBERS:
+        return validate_consensus(question_text, CONSENSUS_MEMBERS, QUORUM, max_retries)
+
     claude_answer = None
     deep_answer = None
+    claude_key = {}        # question number -> latest Claude answer
+    deep_key = {}
+    disputed = None        # None until the first answer sets have been parsed
+    preamble, questions = Answers.split_questions(question_text)
     
     for attempt in range(1, max_retries + 1):
-        console.print(f"\n[yellow]Attempt {attempt}/{max_retries}[/yellow]")
+        out().print(f"\n[yellow]Attempt {attempt}/{max_retries}[/yellow]")
         
-        question_prompt = build_question_prompt(question_text)
+        if disputed is not None:
+            out().print(f"[dim]  Re-asking {len(disputed)} question(s): "
+                          f"{', '.join(f'Q{number}' for number in disputed)}[/dim]")
+        system, question_prompts = build_chunk_prompts(question_text, preamble, questions, disputed)
+        # temperature is 0, so a retry only helps if it skips the cached answers
+        use_cache = attempt == 1
         
-        with console.status("[bold blue]  Processing with Claude...[/bold blue]", spinner="dots"):
-            claude_result = ClaudeConsole.Claude_Connect(CLAUDE_API_KEY, prompt=question_prompt)
-            claude_answer = extract_claude_response(claude_result)
-        
-        if claude_answer:
-            console.print("[green]✓[/green] Claude response received")
-        else:
-            console.print("[red]✗[/red] Claude response failed")
+        claude_chunks, deep_chunks = ask_both(question_prompts, use_cache, system)
         
-        with console.status("[bold blue]  Processing with DeepSeek...[/bold blue]", spinner="dots"):
-            deep_result = DeepConsole.DeepSeek_Connect(DEEP_API_KEY, prompt=question_prompt)
-            deep_answer = extract_deepseek_response(deep_result)
+        # Check if we got valid responses
+        if not claude_chunks or not deep_chunks:
+            out().print("[red]✗[/red] Failed to get responses, retrying...")
+            continue
         
-        if deep_answer:
-            console.print("[green]✓[/green] DeepSeek response received")
-        else:
-            console.print("[red]✗[/red] DeepSeek response failed")
+        # each chunk is parsed on its own: JSON chunk replies cannot be joined
+        claude_parsed = Answers.parse_chunk_answers(claude_chunks)
+        deep_parsed = Answers.parse_chunk_answers(deep_chunks)
+        claude_reply, deep_reply = "\n".join(claude_chunks), "\n".join(deep_chunks)
         
-        # Check if we got valid responses
-        if not claude_answer or not deep_answer:
-            console.print("[red]✗[/red] Failed to get responses, retrying...")
+        if disputed is None and (not claude_parsed or not deep_parsed):
+            # Not in the Q1:/Q2: format - the judge compares the whole sets and
+            # a retry has to re-ask the whole assignment
+            claude_answer, deep_answer = claude_reply, deep_reply
+            validation_answer = ask_judge(build_validation_prompt(claude_answer, deep_answer), use_cache)
+            if validation_answer and validation_answer.strip().lower() == "true":
+                out().print("[bold green]✓ Answers match![/bold green]")
+                return {
+                    "success": True,
+                    "claude_answer": claude_answer,
+                    "deep_answer": deep_answer,
+                    "attempts": attempt
+                }
+            out().print("[red]✗ Answers don't match[/red]")
             continue
         
-        # Compare answers using DeepSeek as validator
-        validation_prompt = build_validation_prompt(claude_answer, deep_answer)
+        # Merge the new answers into the key; on a retry only the re-asked
+        # questions are taken
+        if disputed is not None:
+            claude_parsed = {number: answer for number, answer in claude_parsed.items() if number in disputed}
+            deep_parsed = {number: answer for number, answer in deep_parsed.items() if number in disputed}
+        claude_key.update(claude_parsed)
+        deep_key.update(deep_parsed)
+        claude_answer = Answers.format_answers(dict(sorted(claude_key.items())))
+        deep_answer = Answers.format_answers(dict(sorted(deep_key.items())))
         
-        with console.status("[bold blue]  Validating answers...[/bold blue]", spinner="dots"):
-            validation_result = DeepConsole.DeepSeek_Connect(DEEP_API_KEY, prompt=validation_prompt)
-            validation_answer = extract_deepseek_response(validation_result)
-        console.print("[green]✓[/green] Validation complete")
+        # every numbered question is checked, answered or not
+        asked = disputed if disputed is not None else (list(questions) or sorted(set(claude_key) | set(deep_key)))
+        disputed = find_disagreements(
+            {number: claude_key[number] for number in asked if number in claude_key},
+            {number: deep_key[number] for number in asked if number in deep_key},
+            use_cache,
+        )
+        # a question neither model answered is not in either set, so it is
+        # disputed here rather than silently passing
+        skipped = [number for number in asked if number not in claude_key and number not in deep_key]
+        if skipped:
+            out().print(f"[dim]  Unanswered by both: {', '.join(f'Q{number}' for number in skipped)}[/dim]")
+        disputed = sorted(set(disputed) | set(skipped))
         
         # Check if answers match
-        if validation_answer and validation_answer.strip().lower() == "true":
-            console.print("[bold green]✓ Answers match![/bold green]")
+        if not disputed:
+            out().print("[bold green]✓ Answers match![/bold green]")
             return {
                 "success": True,
                 "claude_answer": claude_answer,
@@ -204,10 +603,10 @@ def validate_answers(question_text, max_retries=3):
                 "attempts": attempt
             }
         else:
-            console.print("[red]✗ Answers don't match[/red]")
+            out().print(f"[red]✗ Answers don't match on {len(disputed)} question(s)[/red]")
     
     # All retries exhausted
-    console.print("[bold red]Max retries reached. Returning best effort.[/bold red]")
+    out().print("[bold red]Max retries reached. Returning best effort.[/bold red]")
     return {
         "success": False,
         "claude_answer": claude_answer,
@@ -216,10 +615,185 @@ def validate_answers(question_text, max_retries=3):
     }
 
 
+# ============ CONSENSUS MODE ============
+
+def ask_consensus(members, prompts, numbers, quorum, use_cache=True, system=None):
+    """
+    Streams every chunk prompt to every member at once and parses a member's
+    answer set as soon as its last chunk arrives. When quorum members agree
+    on every question in numbers (all answered questions if numbers is
+    empty), the streams still running are cancelled instead of awaited.
+
+    Returns:
+        dict: {member label: parsed answer set} for the members that finished
+    """
+    progress = {}
+    parsed = {}
+    cancel = threading.Event()
+    responses = []      # open streamed responses, closed on cancel
+    responses_lock = threading.Lock()
+    chunked = len(prompts) > 1
+    
+    def track(response):
+        with responses_lock:
+            responses.append(response)
+        if cancel.is_set():
+            Providers.cancel(response)
+    
+    def label(member, index):
+        return f"{member} {index + 1}/{len(prompts)}" if chunked else member
+    
+    def show():
+        states = []
+        for member, _ in members:
+            if member in parsed:
+                states.append(f"{member}: done")
+            elif chunked:
+                done = sum(progress.get(label(member, i)) == "done" for i in range(len(prompts)))
+                states.append(f"{member}: {done}/{len(prompts)} chunks")
+            else:
+                states.append(f"{member}: {progress.get(member, 'queued')}")
+        return " · ".join(states)
+    
+    executor = ThreadPoolExecutor(max_workers=len(members) * min(len(prompts), CHUNK_WORKERS))
+    try:
+        futures = {
+            member: [executor.submit(stream_answer, provider.stream(prompt, use_cache, system, on_response=track),
+                                     progress, label(member, i), cancel)
+                     for i, prompt in enumerate(prompts)]
+            for member, provider in members
+        }
+        pending = set(futures)
+        with out().status(f"[bold blue]  Asking {len(members)} models...[/bold blue]", spinner="dots") as status:
+            while pending:
+                wait([future for member in pending for future in futures[member]],
+                     timeout=0.2, return_when=FIRST_COMPLETED)
+                for member in [member for member in pending if all(f.done() for f in futures[member])]:
+                    pending.discard(member)
+                    parts = [future.result() for future in futures[member]]
+                    if all(parts):
+                        parsed[member] = Answers.parse_chunk_answers(parts)
+                        out().print(f"[green]✓[/green] {member} response received")
+                    else:
+                        out().print(f"[red]✗[/red] {member} response failed")
+                
+                expected = numbers or sorted(set().union(*parsed.values()))
+                if pending and expected and len(Answers.find_consensus(parsed, expected, quorum)) == len(expected):
+                    out().print(f"[dim]  Quorum of {quorum} reached; cancelled {', '.join(sorted(pending))}[/dim]")
+                    break
+                status.update("[bold blue]  " + show() + "[/bold blue]")
+    finally:
+        # closing the stragglers' connections cancels their requests at once,
+        # even before a first token; the caller does not wait for them
+        cancel.set()
+        with responses_lock:
+            for response in responses:
+                Providers.cancel(response)
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return parsed
+
+
+def judge_near_quorum(parsed, numbers, quorum, use_cache=True):
+    """
+    For questions short of quorum where the two largest answer clusters
+    would reach it together but only the judge can tell if they agree, asks
+    the judge in one prompt.
+
+    Returns:
+        dict: {question number: (agreed answer, agreeing labels)} for the
+        questions the judge called a match
+    """
+    pairs = {}
+    for number in numbers:
+        answers = {member: answer_set[number] for member, answer_set in parsed.items() if number in answer_set}
+        clusters = Answers.cluster_answers(answers)
+        if len(clusters) >= 2 and len(clusters[0]) + len(clusters[1]) >= quorum:
+            first, second = answers[clusters[0][0]], answers[clusters[1][0]]
+            if Answers.compare_answer(first, second) == Answers.AMBIGUOUS:
+                pairs[number] = (first, second, clusters[0] + clusters[1])
+    if not pairs:
+        return {}
+    
+    judged = Answers.parse_answers(ask_judge(build_question_validation_prompt(
+        Answers.format_answers({number: pair[0] for number, pair in pairs.items()}),
+        Answers.format_answers({number: pair[1] for number, pair in pairs.items()}),
+    ), use_cache))
+    return {number: (pair[0], pair[2]) for number, pair in pairs.items()
+            if Answers.normalize(judged.get(number, "")) == "true"}
+
+
+def validate_consensus(question_text, members, quorum, max_retries=3):
+    """
+    --consensus version of validate_answers(): a question is verified once
+    quorum of the members agree on it. Each attempt ends as soon as every
+    question has its quorum; later attempts re-ask only the questions
+    without one.
+    """
+    labels = [member for member, _ in members]
+    model_keys = {member: {} for member in labels}     # latest answers per member
+    agreed = {}                                         # question number -> (answer, agreeing members)
+    disputed = None
+    attempt = 0
+    preamble, questions = Answers.split_questions(question_text)
+    
+    for attempt in range(1, max_retries + 1):
+        out().print(f"\n[yellow]Attempt {attempt}/{max_retries}[/yellow]")
+        
+        if disputed is not None:
+            out().print(f"[dim]  Re-asking {len(disputed)} question(s): "
+                          f"{', '.join(f'Q{number}' for number in disputed)}[/dim]")
+        system, question_prompts = build_chunk_prompts(question_text, preamble, questions, disputed)
+        use_cache = attempt == 1
+        asked = disputed if disputed is not None else list(questions)
+        
+        parsed = ask_consensus(members, question_prompts, asked, quorum, use_cache, system)
+        if disputed is not None:
+            parsed = {member: {number: answer for number, answer in answer_set.items() if number in disputed}
+                      for member, answer_set in parsed.items()}
+        for member, answer_set in parsed.items():
+            model_keys[member].update(answer_set)
+        
+        asked = asked or sorted(set().union(*parsed.values()))
+        if not asked:
+            out().print("[red]✗[/red] No comparable answer sets received, retrying...")
+            continue
+        
+        found = Answers.find_consensus(parsed, asked, quorum)
+        if len(parsed) == len(members):
+            # nobody was cancelled, so some questions fell short; the judge
+            # settles the ones local comparison could not
+            found.update(judge_near_quorum(parsed, [number for number in asked if number not in found],
+                                           quorum, use_cache))
+        agreed.update(found)
+        disputed = [number for number in asked if number not in agreed]
+        
+        if not disputed:
+            out().print(f"[bold green]✓ Quorum reached on all {len(agreed)} question(s)![/bold green]")
+            break
+        out().print(f"[red]✗ No quorum on {len(disputed)} question(s)[/red]")
+    else:
+        out().print("[bold red]Max retries reached. Returning best effort.[/bold red]")
+    
+    return {
+        "success": not disputed and bool(agreed),
+        "consensus": dict(sorted(agreed.items())),
+        "disputed": disputed or [],
+        "model_answers": {member: Answers.format_answers(dict(sorted(model_keys[member].items())))
+                          for member in labels},
+        "quorum": quorum,
+        "attempts": attempt,
+    }
+
+
 # ============ OUTPUT ============
 
 def save_answer_key(output_path, results, question_text):
     """Saves the answer key to a file."""
+    if "consensus" in results:
+        save_consensus_key(output_path, results)
+        return
+    
     with open(output_path, "w") as f:
         f.write("=" * 50 + "\n")
         f.write("ANSWER KEY\n")
@@ -241,9 +815,176 @@ def save_answer_key(output_path, results, question_text):
         f.write((results["deep_answer"] or "No response received") + "\n")
 
 
+def save_consensus_key(output_path, results):
+    """Saves a --consensus answer key: the agreed answers, who agreed, then every model's answers."""
+    members = list(results["model_answers"])
+    with open(output_path, "w") as f:
+        f.write("=" * 50 + "\n")
+        f.write("ANSWER KEY\n")
+        f.write("=" * 50 + "\n\n")
+        
+        if results["success"]:
+            f.write(f"Status: VERIFIED (at least {results['quorum']} of {len(members)} LLMs agreed on every question)\n\n")
+        else:
+            f.write(f"Status: UNVERIFIED (no quorum of {results['quorum']} on "
+                    f"{', '.join(f'Q{number}' for number in results['disputed']) or 'any question'})\n\n")
+        
+        f.write(f"Attempts: {results['attempts']}\n\n")
+        f.write("-" * 50 + "\n")
+        f.write("Agreed Answers:\n")
+        f.write("-" * 50 + "\n")
+        for number, (answer, agreeing) in results["consensus"].items():
+            f.write(f"Q{number}: {answer}\n    [agreed: {', '.join(agreeing)}]\n")
+        if not results["consensus"]:
+            f.write("None\n")
+        
+        for member in members:
+            f.write("\n" + "-" * 50 + "\n")
+            f.write(f"{member}'s Answers:\n")
+            f.write("-" * 50 + "\n")
+            f.write((results["model_answers"][member] or "No response received") + "\n")
+
+
+# ============ BATCH MODE ============
+
+def collect_batch_files(pattern):
+    """Expands a directory or glob into the assignment files to validate."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*")
+    
+    files = []
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        extension = os.path.splitext(path)[1].lower()
+        # skip answer keys written by earlier runs
+        if os.path.isfile(path) and extension in (".pdf", ".txt") and not path.endswith("_answers.txt"):
+            files.append(path)
+    return files
+
+
+def validate_file(input_path, max_retries=3):
+    """Loads, validates and saves one file silently; returns a summary row."""
+    _worker.console = Console(quiet=True)
+    started = time.monotonic()
+    row = {"file": input_path, "status": "error", "attempts": 0, "seconds": 0.0}
+    
+    try:
+        question_text = load_file(input_path)
+        if not question_text:
+            row["status"] = "load failed"
+            return row
+        
+        results = validate_answers(question_text, max_retries=max_retries)
+        save_answer_key(get_output_path(input_path), results, question_text)
+        
+        row["status"] = "verified" if results["success"] else "unverified"
+        row["attempts"] = results["attempts"]
+    except Exception as e:
+        row["status"] = f"error: {e}"
+    finally:
+        row["seconds"] = time.monotonic() - started
+    
+    return row
+
+
+def run_batch(pattern, workers=4, max_retries=3):
+    """Validates many files concurrently and prints a summary table."""
+    files = collect_batch_files(pattern)
+    if not files:
+        console.print(f"[red]✗ No .pdf or .txt files match: {pattern}[/red]")
+        return []
+    
+    console.print(f"[cyan]Validating {len(files)} file(s) with {workers} worker(s)...[/cyan]")
+    started = time.monotonic()
+    rows = []
+    
+    with console.status("[bold blue]  Validating...[/bold blue]", spinner="dots") as status:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(validate_file, path, max_retries) for path in files]
+            for future in as_completed(futures):
+                row = future.result()
+                rows.append(row)
+                mark = "[green]✓[/green]" if row["status"] == "verified" else "[red]✗[/red]"
+                console.print(f"{mark} {row['file']} ({row['status']}, {row['seconds']:.1f}s)")
+                status.update(f"[bold blue]  Validated {len(rows)}/{len(files)}...[/bold blue]")
+    
+    elapsed = time.monotonic() - started
+    display_batch_summary(sorted(rows, key=lambda row: row["file"]), elapsed)
+    return rows
+
+
+def display_batch_summary(rows, elapsed):
+    """Displays per-file results plus throughput and failure counts."""
+    table = Table(show_header=True, header_style="bold", box=rich.box.DOUBLE_EDGE)
+    
+    table.add_column("File", style="cyan")
+    table.add_column("Status", justify="center")
+    table.add_column("Attempts", justify="right")
+    table.add_column("Time", justify="right")
+    
+    for row in rows:
+        style = "green" if row["status"] == "verified" else "red"
+        table.add_row(os.path.basename(row["file"]), f"[{style}]{row['status']}[/{style}]",
+                      str(row["attempts"]), f"{row['seconds']:.1f}s")
+    
+    console.print(table)
+    
+    verified = sum(1 for row in rows if row["status"] == "verified")
+    unverified = sum(1 for row in rows if row["status"] == "unverified")
+    failed = len(rows) - verified - unverified
+    rate = len(rows) / elapsed * 60 if elapsed else 0.0
+    console.print(f"[bold]{len(rows)} file(s) in {elapsed:.1f}s ({rate:.1f} files/min): "
+                  f"[green]{verified} verified[/green], [yellow]{unverified} unverified[/yellow], "
+                  f"[red]{failed} failed[/red][/bold]")
+
+
+def batch_main(args):
+    """Non-interactive entry point for --batch."""
+    display_header()
+    
+    if not CLAUDE_API_KEY or not DEEP_API_KEY:
+        console.print("[red]✗ API keys not found in .env file[/red]")
+        return 1
+    
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache.enable(path=args.cache_path, refresh=args.refresh_cache)
+    else:
+        helper.cache_dir = None
+    if args.metrics_out:
+        Metrics.open_jsonl(args.metrics_out)
+    
+    try:
+        rows = run_batch(args.batch, workers=max(args.workers, 1), max_retries=args.max_retries)
+    finally:
+        display_metrics(args.metrics_out)
+        if cache is not None:
+            console.print(f"[dim]{cache.summary()}[/dim]")
+            cache.close()
+    
+    return 0 if rows and all(row["status"] == "verified" for row in rows) else 1
+
+
 # ============ MAIN ============
 
 def main():
+    global JSON_ANSWERS, CONSENSUS_MEMBERS, QUORUM
+    args = parse_args()
+    JSON_ANSWERS = args.json_answers
+    if args.consensus:
+        try:
+            CONSENSUS_MEMBERS = build_consensus_members(args.consensus)
+        except ValueError as e:
+            console.print(f"[red]✗ {e}[/red]")
+            sys.exit(2)
+        QUORUM = args.quorum or len(CONSENSUS_MEMBERS) // 2 + 1
+        if not 2 <= QUORUM <= len(CONSENSUS_MEMBERS):
+            console.print(f"[red]✗ --quorum must be between 2 and {len(CONSENSUS_MEMBERS)}[/red]")
+            sys.exit(2)
+    if args.batch:
+        sys.exit(batch_main(args))
+    
+    cache = None
+
     try:
         display_header()
         display_pricing_table()
@@ -254,6 +995,13 @@ def main():
             input("\nPress Enter to exit...")
             return
         
+        if not args.no_cache:
+            cache = ResponseCache.enable(path=args.cache_path, refresh=args.refresh_cache)
+        else:
+            helper.cache_dir = None     # no extracted-PDF cache either
+        if args.metrics_out:
+            Metrics.open_jsonl(args.metrics_out)
+        
         # ========== MAIN LOOP ==========
         while True:
             # Get input file
@@ -290,7 +1038,7 @@ def main():
             console.print("[green]✓[/green] File loaded successfully")
             
             # Run validation
-            results = validate_answers(question_text, max_retries=3)
+            results = validate_answers(question_text, max_retries=args.max_retries)
             
             # Save output
             with console.status("[bold blue]  Saving answer key...[/bold blue]", spinner="dots"):
@@ -304,15 +1052,23 @@ def main():
             if not Confirm.ask("\nValidate another file?", default=True):
                 break
         
+        display_metrics(args.metrics_out)
+        if cache is not None:
+            console.print(f"\n[dim]{cache.summary()}[/dim]")
+        
         console.print("\n[cyan]Goodbye![/cyan]")
         
     except KeyboardInterrupt:
         console.print("\n[yellow]Cancelled by user[/yellow]")
     except Exception as e:
         console.print(f"\n[red]Error: {e}[/red]")
+    finally:
+        if cache is not None:
+            cache.close()
     
     input("\nPress Enter to exit...")
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()    # PDF extraction workers in the frozen exe
     main()
\ No newline at end of file
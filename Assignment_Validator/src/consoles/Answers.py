@@ -0,0 +1,271 @@
+# Parsing and local comparison of "Q1: ..." answer sets, so only answers that
+# genuinely need judgement are sent to the LLM validator
+import math
+import re
+from difflib import SequenceMatcher
+
+from consoles import StructuredOutput
+
+
+MATCH = "match"
+MISMATCH = "mismatch"
+AMBIGUOUS = "ambiguous"
+
+SIMILARITY_THRESHOLD = 0.85    # token similarity above which answers count as the same
+NUMERIC_TOLERANCE = 1e-3       # relative tolerance for numeric answers
+SHORT_ANSWER_WORDS = 6         # numeric/choice rules only apply to answers this short
+
+_QUESTION_LINE = re.compile(r"^\s*[*#_]*\s*Q(?:uestion)?\s*(\d+)\s*[*_]*\s*[:.)\-]\s*[*_]*\s*(.*)$", re.IGNORECASE)
+_NUMBER = re.compile(r"[-+]?\d[\d,]*(?:\.\d+)?(?:[eE][-+]?\d+)?|[-+]?\.\d+")
+_FRACTION = re.compile(r"(\d+)\s*/\s*(\d+)")
+_PURE_NUMBER = re.compile(r"^[-+$]?\s*(?:\d[\d,]*(?:\.\d+)?|\.\d+)(?:[eE][-+]?\d+)?\s*%?$")
+_CHOICE = re.compile(r"^\(?([a-h])(?:[.):]|$)", re.IGNORECASE)
+_QUESTION_START = re.compile(r"^\s*(?:Q(?:uestion)?\s*)?(\d{1,3})\s*[.):]\s+\S", re.IGNORECASE)
+_WORD = re.compile(r"[a-z0-9']+")
+_NEGATIONS = {"not", "no", "never", "none", "nor", "neither", "cannot", "nothing", "nobody", "nowhere"}
+# words whose presence on one side only does not change an answer
+_FILLER = {"a", "an", "the", "is", "are", "was", "were", "be", "it", "its", "this", "that", "which",
+           "of", "so", "thus", "hence", "therefore", "then", "answer", "final", "total", "overall",
+           "approximately", "about", "roughly", "exactly", "equals", "equal", "to", "we", "get", "i", "think"}
+_BOOLEANS = {"true": "true", "yes": "true", "correct": "true",
+             "false": "false", "no": "false", "incorrect": "false"}
+
+
+def parse_answers(text):
+    """
+    Splits a response in the Q1:/Q2: format, or a JSON answer set
+    (StructuredOutput.ANSWER_SCHEMA), into per-question answers.
+
+    Returns:
+        dict: {question number: answer text} in response order; empty if the
+        text does not follow either format
+    """
+    if StructuredOutput.looks_like_json(text):
+        answers = StructuredOutput.parse_answer_set(text)
+        if answers:
+            return answers
+
+    answers = {}
+    current = None
+    for line in (text or "").splitlines():
+        found = _QUESTION_LINE.match(line)
+        if found:
+            current = int(found.group(1))
+            answers[current] = found.group(2).strip()
+        elif current is not None and line.strip():
+            answers[current] = (answers[current] + "\n" + line.strip()).strip()
+    return answers
+
+
+def parse_chunk_answers(texts):
+    """
+    parse_answers() of each chunk reply, merged in order. Chunk replies are
+    parsed one by one because JSON answer sets cannot simply be concatenated.
+    """
+    answers = {}
+    for text in texts:
+        answers.update(parse_answers(text))
+    return answers
+
+
+def split_questions(text):
+    """
+    Splits an assignment into its numbered questions ("1.", "2)", "Q3:",
+    "Question 4."). Numbers must run 1, 2, 3... so numbered sub-lists inside a
+    question are not mistaken for new questions.
+
+    Returns:
+        tuple: (preamble before question 1, {question number: question text});
+        the dict is empty if no numbering was found
+    """
+    preamble = []
+    questions = {}
+    current = None
+    for line in (text or "").splitlines():
+        found = _QUESTION_START.match(line)
+        if found and int(found.group(1)) == (current or 0) + 1:
+            current = int(found.group(1))
+            questions[current] = line.strip()
+        elif current is None:
+            preamble.append(line)
+        else:
+            questions[current] += "\n" + line.rstrip()
+    return "\n".join(preamble).strip(), {number: question.strip() for number, question in questions.items()}
+
+
+def chunk_questions(questions, numbers, max_chars, max_questions):
+    """
+    Groups question numbers, in order, into chunks holding at most
+    max_questions questions and max_chars characters of question text (a
+    single oversized question still gets its own chunk).
+
+    Returns:
+        list: Lists of question numbers
+    """
+    chunks = []
+    current = []
+    size = 0
+    for number in numbers:
+        length = len(questions[number])
+        if current and (len(current) >= max_questions or size + length > max_chars):
+            chunks.append(current)
+            current = []
+            size = 0
+        current.append(number)
+        size += length
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def format_answers(answers):
+    """Inverse of parse_answers()."""
+    return "\n".join(f"Q{number}: {answer}" for number, answer in answers.items())
+
+
+def normalize(answer):
+    """Lowercases and strips markdown, punctuation and extra whitespace."""
+    text = re.sub(r"[*_`#]", "", answer or "").lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .;:!")
+
+
+def _numbers(text):
+    text = _FRACTION.sub(lambda f: str(int(f.group(1)) / int(f.group(2))) if int(f.group(2)) else f.group(0), text)
+    values = []
+    for raw in _NUMBER.findall(text):
+        try:
+            values.append(float(raw.replace(",", "")))
+        except ValueError:
+            continue
+    return values
+
+
+def _choice(text):
+    if text in _BOOLEANS:
+        return _BOOLEANS[text]
+    found = _CHOICE.match(text)
+    return found.group(1) if found else None
+
+
+def _negations(words):
+    return sum(word in _NEGATIONS or word.endswith("n't") for word in words)
+
+
+def _same_substance(a, b):
+    """
+    False if two similar-looking answers differ in anything but filler:
+    different numbers, a negation on one side only, or any other content word
+    ("Sydney" / "Canberra", "increasing" / "decreasing").
+    """
+    numbers_a, numbers_b = sorted(_numbers(a)), sorted(_numbers(b))
+    if len(numbers_a) != len(numbers_b) or not all(
+            math.isclose(x, y, rel_tol=NUMERIC_TOLERANCE, abs_tol=1e-9) for x, y in zip(numbers_a, numbers_b)):
+        return False
+
+    words_a, words_b = _WORD.findall(a), _WORD.findall(b)
+    if _negations(words_a) != _negations(words_b):
+        return False
+
+    # numbers were compared above, with tolerance ("0.5" / "0.50")
+    differing = {word for word in set(words_a) ^ set(words_b) if not _NUMBER.fullmatch(word)}
+    return differing <= _FILLER
+
+
+def compare_answer(answer_1, answer_2):
+    """
+    Compares one question's answers locally.
+
+    Returns:
+        str: MATCH, MISMATCH, or AMBIGUOUS when only the LLM judge can tell
+    """
+    a, b = normalize(answer_1), normalize(answer_2)
+    if not a or not b:
+        return MISMATCH if a != b else MATCH
+    if a == b:
+        return MATCH
+
+    short = len(a.split()) <= SHORT_ANSWER_WORDS and len(b.split()) <= SHORT_ANSWER_WORDS
+    if short:
+        choice_a, choice_b = _choice(a), _choice(b)
+        if choice_a and choice_b:
+            return MATCH if choice_a == choice_b else MISMATCH
+
+        numbers_a, numbers_b = _numbers(a), _numbers(b)
+        if numbers_a and numbers_b:
+            same = len(numbers_a) == len(numbers_b) and all(
+                math.isclose(x, y, rel_tol=NUMERIC_TOLERANCE, abs_tol=1e-9)
+                for x, y in zip(numbers_a, numbers_b)
+            )
+            if same:
+                return MATCH
+            # "12" vs "15" is a clear disagreement; "50%" vs "0.5" is for the judge
+            if _PURE_NUMBER.match(a) and _PURE_NUMBER.match(b):
+                return MISMATCH
+
+    # near-identical wording is only a match if nothing that can flip the
+    # meaning changed; otherwise the judge decides
+    if SequenceMatcher(None, a.split(), b.split()).ratio() >= SIMILARITY_THRESHOLD and _same_substance(a, b):
+        return MATCH
+    return AMBIGUOUS
+
+
+def compare_answer_sets(answers_1, answers_2):
+    """
+    Compares two parsed answer sets question by question. A question answered
+    by only one side is a mismatch.
+
+    Returns:
+        dict: {question number: MATCH / MISMATCH / AMBIGUOUS}
+    """
+    verdicts = {}
+    for number in list(answers_1) + [n for n in answers_2 if n not in answers_1]:
+        if number not in answers_1 or number not in answers_2:
+            verdicts[number] = MISMATCH
+        else:
+            verdicts[number] = compare_answer(answers_1[number], answers_2[number])
+    return verdicts
+
+
+def cluster_answers(answers):
+    """
+    Groups several models' answers to one question into clusters that match
+    locally (AMBIGUOUS pairs stay apart).
+
+    Args:
+        answers: {model label: answer text}
+
+    Returns:
+        list: Lists of model labels, largest cluster first
+    """
+    clusters = []
+    for label, answer in answers.items():
+        for cluster in clusters:
+            if compare_answer(answers[cluster[0]], answer) == MATCH:
+                cluster.append(label)
+                break
+        else:
+            clusters.append([label])
+    return sorted(clusters, key=len, reverse=True)
+
+
+def find_consensus(answer_sets, numbers, quorum):
+    """
+    Finds the questions on which at least quorum models give matching answers.
+
+    Args:
+        answer_sets: {model label: parsed answer set}
+        numbers: Question numbers to check
+        quorum: Models that must agree
+
+    Returns:
+        dict: {question number: (agreed answer, labels of the agreeing models)}
+        for the questions that reached quorum
+    """
+    agreed = {}
+    for number in numbers:
+        answers = {label: answer_set[number] for label, answer_set in answer_sets.items() if number in answer_set}
+        clusters = cluster_answers(answers)
+        if clusters and len(clusters[0]) >= quorum:
+            agreed[number] = (answers[clusters[0][0]], clusters[0])
+    return agreed
@@ -1,8 +1,8 @@
 # Claude API - takes prompt and gives output to main business logic
-import requests
+from consoles import Providers
 
 
-def Claude_Connect(api_key, prompt, model="claude-sonnet-4-5-20250929"):
+def Claude_Connect(api_key, prompt, model="claude-sonnet-4-5-20250929", use_cache=True, system=None):
     """
     Sends a prompt to Claude API and returns the response.
     
@@ -10,42 +10,23 @@ def Claude_Connect(api_key, prompt, model="claude-sonnet-4-5-20250929"):
         api_key: Anthropic API key
         prompt: The text prompt to send
         model: Model to use (default: claude-sonnet-4-5-20250929)
+        use_cache: Return a cached response if there is one (new responses
+            are stored either way)
+        system: Instruction prefix shared across calls, sent as a cacheable
+            system block
     
     Returns:
         dict: Full API response JSON, or None if error
     """
-    try:
-        api_url = "https://api.anthropic.com/v1/messages"
+    return Providers.ClaudeProvider(api_key, model=model).complete(prompt, use_cache, system)
 
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": api_key,
-            "anthropic-version": "2023-06-01"
-        }
 
-        payload = {
-            "model": model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 4000,
-            "temperature": 0
-        }
-
-        response = requests.post(api_url, headers=headers, json=payload)
-        response.raise_for_status()
-
-        return response.json()
-
-    except requests.exceptions.HTTPError as e:
-        print(f"Claude API HTTP error: {e}")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("Claude API connection error - check your internet")
-        return None
-    except Exception as e:
-        print(f"Claude API error: {e}")
-        return None
+def Claude_Stream(api_key, prompt, model="claude-sonnet-4-5-20250929", use_cache=True, system=None):
+    """
+    Streams a Claude completion, yielding text pieces as they arrive.
+    Raises on API errors; closing the generator cancels the request.
+    """
+    return Providers.ClaudeProvider(api_key, model=model).stream(prompt, use_cache, system)
 
 
 def extract_response(result):
@@ -58,6 +39,4 @@ def extract_response(result):
     Returns:
         str: The text response, or None if error
     """
-    if result and "content" in result:
-        return result["content"][0]["text"]
-    return None
\ No newline at end of file
+    return Providers.ClaudeProvider(None).extract_text(result)
\ No newline at end of file
@@ -1,47 +1,23 @@
-import requests
+from consoles import Providers
 
 
-def DeepSeek_Connect(api_key, prompt, model="deepseek-chat"):
+def DeepSeek_Connect(api_key, prompt, model="deepseek-chat", use_cache=True, system=None):
     """
     Sends a prompt to DeepSeek API and returns the response.
     """
-    try:
-        api_url = "https://api.deepseek.com/v1/chat/completions"
+    return Providers.DeepSeekProvider(api_key, model=model).complete(prompt, use_cache, system)
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
 
-        payload = {
-            "model": model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 4000,
-            "temperature": 0
-        }
-
-        response = requests.post(api_url, headers=headers, json=payload)
-        response.raise_for_status()
-
-        return response.json()
-
-    except requests.exceptions.HTTPError as e:
-        print(f"DeepSeek API HTTP error: {e}")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("DeepSeek API connection error - check your internet")
-        return None
-    except Exception as e:
-        print(f"DeepSeek API error: {e}")
-        return None
+def DeepSeek_Stream(api_key, prompt, model="deepseek-chat", use_cache=True, system=None):
+    """
+    Streams a DeepSeek completion, yielding text pieces as they arrive.
+    Raises on API errors; closing the generator cancels the request.
+    """
+    return Providers.DeepSeekProvider(api_key, model=model).stream(prompt, use_cache, system)
 
 
 def extract_response(result):
     """
     Extracts the text content from DeepSeek's API response.
     """
-    if result and "choices" in result:
-        return result["choices"][0]["message"]["content"]
-    return None
\ No newline at end of file
+    return Providers.DeepSeekProvider(None).extract_text(result)
\ No newline at end of file
@@ -1,32 +1,106 @@
-import PyPDF2
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "assignment_validator", "pdf_text")
+PARALLEL_MIN_PAGES = 24     # below this, starting worker processes costs more than it saves
+PAGES_PER_WORKER = 8
+
+
+def _extract_page_range(file_path, start, end):
+    """Worker: extracts pages [start, end) of a PDF. Each process opens its own reader."""
+    import PyPDF2
+
+    texts = []
+    with open(file_path, "rb") as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for index in range(start, end):
+            try:
+                texts.append(pdf_reader.pages[index].extract_text() or "")
+            except Exception:
+                texts.append("")
+    return texts
 
 
 class Helper:
 
-    def __init__(self, name="Helper"):
+    def __init__(self, name="Helper", cache_dir=DEFAULT_CACHE_DIR, workers=None):
         self.name = name
+        self.cache_dir = cache_dir
+        self.workers = workers or os.cpu_count() or 1
+
+    def iter_pdf_pages(self, file_path):
+        """Yields the text of each page lazily, one page at a time."""
+        import PyPDF2   # only PDF input needs it; keeps startup light
+
+        with open(file_path, "rb") as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+
+            for page in pdf_reader.pages:
+                try:
+                    yield page.extract_text() or ""
+                except Exception:
+                    yield ""
 
     def load_pdf(self, file_path):
-        """Extracts text from every page of a PDF."""
+        """
+        Extracts text from every page of a PDF. Long documents are split into
+        page ranges extracted in parallel processes, and the result is cached
+        by file hash and mtime so re-validating the same PDF skips extraction.
+        """
         try:
-            text = ""
-            with open(file_path, "rb") as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-
-                for page in pdf_reader.pages:
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    except Exception:
-                        continue
+            cache_path = self._cache_path(file_path)
+            if cache_path and os.path.exists(cache_path):
+                with open(cache_path, "r", encoding="utf-8") as file:
+                    return file.read()
 
+            import PyPDF2
+            with open(file_path, "rb") as file:
+                page_count = len(PyPDF2.PdfReader(file).pages)
+
+            workers = min(self.workers, page_count // PAGES_PER_WORKER)
+            if page_count < PARALLEL_MIN_PAGES or workers < 2:
+                pages = list(self.iter_pdf_pages(file_path))
+            else:
+                step = -(-page_count // workers)    # ceiling division
+                ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(_extract_page_range, file_path, start, end) for start, end in ranges]
+                    pages = [text for future in futures for text in future.result()]
+
+            text = "".join(page_text + "\n" for page_text in pages if page_text)
+
+            if cache_path:
+                self._write_cache(cache_path, text)
             return text
 
         except Exception as e:
             print(f"Error loading PDF: {e}")
             return None
 
+    def _cache_path(self, file_path):
+        """Cache file for this exact PDF content and modification time, or None if caching is off."""
+        if not self.cache_dir:
+            return None
+
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        digest.update(str(os.stat(file_path).st_mtime_ns).encode("utf-8"))
+        return os.path.join(self.cache_dir, digest.hexdigest() + ".txt")
+
+    def _write_cache(self, cache_path, text):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = cache_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(text)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass    # a cache we cannot write is not worth failing the load over
+
 
 
     def load_txt(self, file_path):
@@ -50,4 +124,4 @@ class Helper:
     def help_FAQ(self, file_path):
         """Returns help documentation."""
         help_text = ""
-        return help_text
\ No newline at end of file
+        return help_text
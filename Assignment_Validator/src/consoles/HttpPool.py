@@ -0,0 +1,65 @@
+# Keep-alive HTTP sessions, one connection pool per provider
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 300    # a 4000-token completion can take minutes
+
+
+class ProviderPool:
+    """A requests.Session whose adapter keeps up to pool_size connections alive."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, url, **kwargs):
+        """POSTs through the pooled session with the configured timeouts."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def get(self, url, **kwargs):
+        """GETs through the pooled session with the configured timeouts."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def configure(provider, **kwargs):
+    """Replaces the pool for provider, closing the old one's connections."""
+    with _pools_lock:
+        old = _pools.pop(provider, None)
+        if old:
+            old.close()
+        _pools[provider] = ProviderPool(**kwargs)
+        return _pools[provider]
+
+
+def get_pool(provider):
+    """Returns the shared pool for provider, creating it with defaults if needed."""
+    with _pools_lock:
+        if provider not in _pools:
+            _pools[provider] = ProviderPool()
+        return _pools[provider]
+
+
+def close_all():
+    """Closes every pooled connection."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,152 @@
+# Offline batch submission - half-price, no per-request latency, results within 24h
+import json
+import time
+
+from consoles import HttpPool
+from consoles import RateLimiter
+
+
+ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+
+class BatchClient:
+    """Shared plumbing: requests go through the provider's pool and limiter."""
+
+    provider = None
+    headers = {}
+
+    def _request(self, method, url, **kwargs):
+        pool = HttpPool.get_pool(self.provider)
+        send = pool.post if method == "POST" else pool.get
+        response = RateLimiter.get_limiter(self.provider).send(
+            lambda: send(url, headers=self.headers, **kwargs)
+        )
+        response.raise_for_status()
+        return response
+
+
+class ClaudeBatches(BatchClient):
+    """Anthropic Message Batches API (/v1/messages/batches)."""
+
+    provider = "claude"
+
+    def __init__(self, api_key, base_url=None):
+        self.base_url = (base_url or ANTHROPIC_BASE_URL).rstrip("/")
+        self.headers = {
+            "Content-Type": "application/json",
+            "x-api-key": api_key,
+            "anthropic-version": "2023-06-01"
+        }
+
+    def submit(self, requests):
+        """
+        Submits a batch.
+
+        Args:
+            requests: List of (custom_id, payload) pairs; payload is the body
+                a single /v1/messages call would send
+
+        Returns:
+            str: The batch id
+        """
+        body = {"requests": [{"custom_id": custom_id, "params": payload} for custom_id, payload in requests]}
+        return self._request("POST", f"{self.base_url}/v1/messages/batches", json=body).json()["id"]
+
+    def is_done(self, batch_id):
+        info = self._request("GET", f"{self.base_url}/v1/messages/batches/{batch_id}").json()
+        return info.get("processing_status") == "ended"
+
+    def results(self, batch_id):
+        """
+        Returns {custom_id: response} where response has the same shape as a
+        /v1/messages reply, or None for a request that errored or expired.
+        """
+        info = self._request("GET", f"{self.base_url}/v1/messages/batches/{batch_id}").json()
+        results_url = info.get("results_url") or f"{self.base_url}/v1/messages/batches/{batch_id}/results"
+
+        results = {}
+        for line in self._request("GET", results_url).text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            result = entry.get("result", {})
+            results[entry["custom_id"]] = result.get("message") if result.get("type") == "succeeded" else None
+        return results
+
+
+class DeepSeekBatches(BatchClient):
+    """
+    OpenAI-compatible batch shape: upload a JSONL file to /v1/files, then
+    create a job on /v1/batches. Used when the DeepSeek endpoint (or a
+    compatible gateway given as base_url) exposes it.
+    """
+
+    provider = "deepseek"
+
+    def __init__(self, api_key, base_url=None):
+        self.base_url = (base_url or DEEPSEEK_BASE_URL).rstrip("/")
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+
+    def submit(self, requests):
+        """Uploads the requests as a batch file and starts the job; returns the batch id."""
+        lines = [
+            json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": payload})
+            for custom_id, payload in requests
+        ]
+        upload = self._request(
+            "POST", f"{self.base_url}/v1/files",
+            files={"file": ("batch.jsonl", "\n".join(lines).encode("utf-8"), "application/jsonl")},
+            data={"purpose": "batch"},
+        ).json()
+
+        body = {
+            "input_file_id": upload["id"],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h"
+        }
+        return self._request("POST", f"{self.base_url}/v1/batches", json=body).json()["id"]
+
+    def is_done(self, batch_id):
+        info = self._request("GET", f"{self.base_url}/v1/batches/{batch_id}").json()
+        return info.get("status") in ("completed", "failed", "expired", "cancelled")
+
+    def results(self, batch_id):
+        """Returns {custom_id: chat completion response, or None if it failed}."""
+        info = self._request("GET", f"{self.base_url}/v1/batches/{batch_id}").json()
+        if not info.get("output_file_id"):
+            return {}
+
+        results = {}
+        content = self._request("GET", f"{self.base_url}/v1/files/{info['output_file_id']}/content").text
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            results[entry["custom_id"]] = response.get("body") if response.get("status_code") == 200 else None
+        return results
+
+
+def check_supported(provider, base_url=None):
+    """
+    Raises ValueError if provider has no batch endpoint to talk to: DeepSeek's
+    own API has none, so it needs base_url pointing at a compatible gateway.
+    """
+    if provider == "deepseek" and not base_url:
+        raise ValueError("DeepSeek's API has no batch endpoints; use --mode sync, "
+                         "or --base_url for an OpenAI-compatible batch gateway")
+
+
+def get_client(provider, api_key, base_url=None):
+    """Returns the batch client for "claude" or "deepseek"."""
+    check_supported(provider, base_url)
+    if provider == "claude":
+        return ClaudeBatches(api_key, base_url)
+    return DeepSeekBatches(api_key, base_url)
+
+
+def wait(client, batch_id, poll_interval=30):
+    """Blocks until the batch has finished processing."""
+    while not client.is_done(batch_id):
+        time.sleep(poll_interval)
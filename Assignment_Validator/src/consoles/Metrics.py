@@ -0,0 +1,169 @@
+# In-process registry of per-call metrics - latency, time to first byte,
+# tokens, retries and HTTP status for every LLM request, priced per provider.
+# Only running aggregates stay in memory; each call can be appended to a JSON
+# lines file the moment it is recorded
+import json
+import threading
+import time
+from array import array
+
+
+# Per million tokens as (low, high); estimates use the high end so they err
+# on the expensive side. display_pricing_table() renders this table too. A
+# rate of None is unpriced (shown as "—"); those tokens are estimated at the
+# plain input rate.
+PRICING = {
+    "chatgpt": {"label": "ChatGPT", "input": (0.25, 0.25), "cached_input": (0.025, 0.025), "output": (2.00, 2.00)},
+    "deepseek": {"label": "DeepSeek", "input": (0.28, 0.28), "cached_input": (0.028, 0.028), "output": (0.42, 0.42)},
+    "claude": {"label": "Claude", "input": (0.10, 5.00), "cached_input": None, "output": (1.25, 2.00)},
+}
+BATCH_DISCOUNT = 0.5    # provider batch jobs are billed at half price
+
+_routes = {}    # route -> running aggregates, see _new_aggregate()
+_totals = {"calls": 0, "cached": 0, "errors": 0, "retries": 0, "cost": 0.0}     # kept as calls are recorded
+_out = None     # open --metrics_out file, if any
+_lock = threading.Lock()
+
+
+def _new_aggregate():
+    return {"calls": 0, "cached": 0, "errors": 0, "retries": 0, "cost": 0.0,
+            "cache_read_tokens": 0, "uncached_input_tokens": 0, "output_tokens": 0,
+            "latencies": array("d"),    # uncached calls only, for the p95
+            "ttfb_sum": 0.0, "ttfb_count": 0}
+
+
+def estimate_cost(provider, cache_read=0, cache_write=0, uncached=0, output=0, kind=None):
+    """Estimated dollar cost of one call's tokens, or 0.0 for an unpriced provider."""
+    rates = PRICING.get(provider)
+    if rates is None:
+        return 0.0
+    cost = (cache_read * (rates["cached_input"] or rates["input"])[1]
+            + cache_write * rates["input"][1]
+            + uncached * rates["input"][1]
+            + output * rates["output"][1]) / 1_000_000
+    return cost * BATCH_DISCOUNT if kind == "batch" else cost
+
+
+def record(provider, model, kind, start=None, response=None, usage=None, ttfb=None, cached=False, error=None,
+           route=None):
+    """
+    Adds one call to the registry, and to the JSON lines file if one is open.
+
+    Args:
+        provider: Provider name ("claude", "deepseek")
+        model: Model the call went to
+        kind: "complete", "stream" or "batch"
+        start: time.monotonic() when the call began; None when latency is
+            not meaningful (batch results)
+        response: The last requests.Response, if one arrived; supplies the
+            HTTP status, retry count and time to first byte
+        usage: (cache read, cache write, uncached input, output) tokens
+        ttfb: Seconds to the first streamed token, overriding the response's
+        cached: Served from the local response cache, no API call made
+        error: Error message if the call failed
+        route: Pool/limiter key of the instance that made the call, when one
+            provider is used with several API keys
+    """
+    cache_read, cache_write, uncached, output = usage or (0, 0, 0, 0)
+    if ttfb is None and response is not None:
+        ttfb = response.elapsed.total_seconds()
+
+    entry = {
+        "time": time.time(),
+        "provider": provider,
+        "route": route or provider,
+        "model": model,
+        "kind": kind,
+        "latency": round(time.monotonic() - start, 4) if start is not None else None,
+        "ttfb": round(ttfb, 4) if ttfb is not None else None,
+        "status": response.status_code if response is not None else None,
+        "retries": getattr(response, "retries", 0),
+        "cached": cached,
+        "cache_read_tokens": cache_read,
+        "cache_write_tokens": cache_write,
+        "uncached_input_tokens": uncached,
+        "output_tokens": output,
+        "cost": round(estimate_cost(provider, cache_read, cache_write, uncached, output, kind), 6),
+        "error": error,
+    }
+    with _lock:
+        for aggregate in (_totals, _routes.setdefault(entry["route"], _new_aggregate())):
+            aggregate["calls"] += 1
+            aggregate["cached"] += cached
+            aggregate["errors"] += bool(error)
+            aggregate["retries"] += entry["retries"]
+            aggregate["cost"] += entry["cost"]
+        own = _routes[entry["route"]]
+        own["cache_read_tokens"] += cache_read
+        own["uncached_input_tokens"] += uncached + cache_write
+        own["output_tokens"] += output
+        if entry["latency"] is not None and not cached:
+            own["latencies"].append(entry["latency"])
+        if entry["ttfb"] is not None:
+            own["ttfb_sum"] += entry["ttfb"]
+            own["ttfb_count"] += 1
+        if _out is not None:
+            # flushed per call, so a crash keeps everything recorded so far
+            _out.write(json.dumps(entry) + "\n")
+            _out.flush()
+    return entry
+
+
+def totals():
+    """Running call, cache hit, error, retry and cost counts, without copying every call."""
+    with _lock:
+        return dict(_totals)
+
+
+def reset():
+    with _lock:
+        _routes.clear()
+        _totals.update(calls=0, cached=0, errors=0, retries=0, cost=0.0)
+
+
+def open_jsonl(path):
+    """From now on, appends every recorded call to path, one JSON object per line."""
+    global _out
+    close_jsonl()
+    with _lock:
+        _out = open(path, "a", encoding="utf-8")
+
+
+def close_jsonl():
+    global _out
+    with _lock:
+        if _out is not None:
+            _out.close()
+            _out = None
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summary():
+    """One line per provider (per API key when routed) plus a total; empty string if nothing was recorded."""
+    with _lock:
+        routes = {route: dict(aggregate, latencies=list(aggregate["latencies"]))
+                  for route, aggregate in _routes.items()}
+    lines = []
+    total_cost = 0.0
+    for route, own in routes.items():
+        latencies = own["latencies"]
+        total_cost += own["cost"]
+
+        line = (f"{route}: {own['calls']} calls ({own['cached']} from cache, "
+                f"{own['errors']} failed), {own['retries']} retries")
+        if latencies:
+            line += (f", latency avg {sum(latencies) / len(latencies):.2f}s"
+                     f" / p95 {_percentile(latencies, 0.95):.2f}s")
+        if own["ttfb_count"]:
+            line += f", first byte avg {own['ttfb_sum'] / own['ttfb_count']:.2f}s"
+        line += (f"; input {own['cache_read_tokens']:,} cached + {own['uncached_input_tokens']:,} uncached"
+                 f", output {own['output_tokens']:,} tokens; est. ${own['cost']:.4f}")
+        lines.append(line)
+
+    if len(lines) > 1:
+        lines.append(f"total: est. ${total_cost:.4f}")
+    return "\n".join(lines)
@@ -0,0 +1,394 @@
+# One interface for every LLM provider - pooling, rate limiting, retries and
+# caching all live in Provider.complete(), the single hot path for API calls
+import asyncio
+import json
+import socket
+import time
+import warnings
+
+import requests
+import urllib3
+
+from consoles import HttpPool
+from consoles import Metrics
+from consoles import RateLimiter
+from consoles import ResponseCache
+
+
+class Provider:
+    """
+    Base class for an LLM provider. Subclasses describe the endpoint, headers
+    and response shape; everything else is shared.
+    """
+
+    name = None             # key for the shared pool, limiter and cache
+    label = None            # name shown to users and used by --LLM_model
+    default_model = None
+    base_url = None
+    api_path = None
+    api_key_env = None      # environment variable holding the key
+    max_tokens = 4000
+
+    def __init__(self, api_key, model=None, base_url=None, route=None):
+        self.api_key = api_key
+        self.model = model or self.default_model
+        if base_url:
+            self.base_url = base_url.rstrip("/")
+        # key for the connection pool and rate limiter; instances holding
+        # different API keys need their own (see consoles.Router)
+        self.route = route or self.name
+
+    @property
+    def api_url(self):
+        return self.base_url + self.api_path
+
+    def headers(self):
+        raise NotImplementedError
+
+    def build_payload(self, prompt, system=None):
+        """
+        Request body for a single prompt. system is the stable instruction
+        prefix shared by many calls; it goes first so the provider can serve
+        it from its prompt cache.
+        """
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": 0
+        }
+
+    def extract_text(self, result):
+        """Returns the completion text from a response, or None."""
+        raise NotImplementedError
+
+    def parse_stream_event(self, event):
+        """Returns the text delta carried by one server-sent event, or None."""
+        raise NotImplementedError
+
+    def wrap_text(self, text):
+        """Builds a minimal response holding text, in the shape complete() returns."""
+        raise NotImplementedError
+
+    def parse_usage(self, usage):
+        """Returns (cache read, cache write, uncached input, output) token counts from a usage block."""
+        raise NotImplementedError
+
+    def parse_stream_usage(self, event):
+        """Returns the usage block carried by one server-sent event, or None."""
+        return event.get("usage")
+
+    def record_usage(self, result, kind="batch"):
+        """Records the token usage of a response fetched outside complete() and stream()."""
+        if result and result.get("usage"):
+            Metrics.record(self.name, self.model, kind, usage=self.parse_usage(result["usage"]), route=self.route)
+
+    def complete(self, prompt, use_cache=True, system=None, raise_errors=False):
+        """
+        Sends a prompt and returns the full API response.
+
+        Args:
+            prompt: The text prompt to send
+            use_cache: Return a cached response if there is one (new responses
+                are stored either way)
+            system: Instruction prefix shared across calls, sent as a
+                cacheable system block
+            raise_errors: Raise request errors instead of printing them and
+                returning None
+
+        Returns:
+            dict: Full API response JSON, or None if error
+        """
+        start = time.monotonic()
+        response = None
+        usage = None
+        cached = None
+        error = None
+        try:
+            payload = self.build_payload(prompt, system)
+
+            cache_key, cached = ResponseCache.lookup(self.name, self.model, payload["max_tokens"],
+                                                     _full_prompt(prompt, system), use_cache)
+            if cached is not None:
+                return cached
+
+            headers = self.headers()
+            limiter = RateLimiter.get_limiter(self.route)
+            response = limiter.send(
+                lambda: HttpPool.get_pool(self.route).post(self.api_url, headers=headers, json=payload),
+                tokens=RateLimiter.estimate_tokens(_full_prompt(prompt, system)),
+            )
+            response.raise_for_status()
+
+            result = response.json()
+            usage = self.parse_usage(result.get("usage") or {})
+            limiter.charge(usage[3])    # output tokens, settled once known
+            ResponseCache.store(cache_key, self.name, self.model, result)
+            return result
+
+        except requests.exceptions.HTTPError as e:
+            error = str(e)
+            if raise_errors:
+                raise
+            print(f"{self.label} API HTTP error: {e}")
+            return None
+        except requests.exceptions.ConnectionError as e:
+            error = str(e)
+            if raise_errors:
+                raise
+            print(f"{self.label} API connection error - check your internet")
+            return None
+        except Exception as e:
+            error = str(e)
+            if raise_errors:
+                raise
+            print(f"{self.label} API error: {e}")
+            return None
+        finally:
+            Metrics.record(self.name, self.model, "complete", start, response, usage,
+                           cached=cached is not None, error=error, route=self.route)
+
+    def stream(self, prompt, use_cache=True, system=None, on_response=None):
+        """
+        Sends a prompt with streaming on and yields text deltas as they arrive
+        over server-sent events. Unlike complete(), errors are raised. Closing
+        the generator early closes the connection, which cancels the request;
+        a stream read to the end is cached like a complete() response.
+
+        on_response, if given, is called with the response as soon as its
+        headers arrive; passing it to cancel() from another thread ends the
+        request even while no token has arrived yet.
+        """
+        start = time.monotonic()
+        payload = self.build_payload(prompt, system)
+
+        cache_key, cached = ResponseCache.lookup(self.name, self.model, payload["max_tokens"],
+                                                 _full_prompt(prompt, system), use_cache)
+        if cached is not None:
+            Metrics.record(self.name, self.model, "stream", start, cached=True, route=self.route)
+            text = self.extract_text(cached)
+            if text:
+                yield text
+            return
+
+        payload.update(self.stream_options())
+        headers = self.headers()
+        limiter = RateLimiter.get_limiter(self.route)
+        try:
+            response = limiter.send(
+                lambda: HttpPool.get_pool(self.route).post(self.api_url, headers=headers, json=payload, stream=True),
+                tokens=RateLimiter.estimate_tokens(_full_prompt(prompt, system)),
+            )
+        except Exception as e:
+            Metrics.record(self.name, self.model, "stream", start, error=str(e), route=self.route)
+            raise
+        if on_response is not None:
+            on_response(response)
+
+        usage = {}
+        first_token = None
+        error = "cancelled"     # cleared once the stream is read to the end
+        try:
+            response.raise_for_status()
+            response.encoding = "utf-8"
+
+            parts = []
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                usage.update(self.parse_stream_usage(event) or {})
+                delta = self.parse_stream_event(event)
+                if delta:
+                    if first_token is None:
+                        first_token = time.monotonic() - start
+                    parts.append(delta)
+                    yield delta
+
+            error = None
+            ResponseCache.store(cache_key, self.name, self.model, self.wrap_text("".join(parts)))
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            response.close()
+            if usage:
+                limiter.charge(self.parse_usage(usage)[3])
+            Metrics.record(self.name, self.model, "stream", start, response,
+                           self.parse_usage(usage) if usage else None, ttfb=first_token, error=error,
+                           route=self.route)
+
+    def stream_options(self):
+        """Extra request body fields that turn streaming on."""
+        return {"stream": True}
+
+    async def acomplete(self, prompt, use_cache=True, system=None):
+        """Async complete(); the blocking call runs on a worker thread."""
+        return await asyncio.to_thread(self.complete, prompt, use_cache, system)
+
+    def complete_text(self, prompt, use_cache=True, system=None):
+        """complete() followed by extract_text()."""
+        return self.extract_text(self.complete(prompt, use_cache, system))
+
+
+class ClaudeProvider(Provider):
+    name = "claude"
+    label = "Claude"
+    default_model = "claude-sonnet-4-5-20250929"
+    base_url = "https://api.anthropic.com"
+    api_path = "/v1/messages"
+    api_key_env = "ANTHROPIC_API_KEY"
+
+    def headers(self):
+        return {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,             # not "Authorization: Bearer"
+            "anthropic-version": "2023-06-01"      # required
+        }
+
+    def build_payload(self, prompt, system=None):
+        # Anthropic takes the system prompt as a top-level field; the
+        # cache_control marker caches everything up to the end of the block
+        payload = super().build_payload(prompt)
+        if system:
+            payload["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        return payload
+
+    def extract_text(self, result):
+        if result and result.get("content"):
+            return result["content"][0].get("text")
+        return None
+
+    def parse_stream_event(self, event):
+        if event.get("type") == "error":
+            raise RuntimeError(event.get("error", {}).get("message", "stream error"))
+        if event.get("type") == "content_block_delta":
+            return event.get("delta", {}).get("text")
+        return None
+
+    def wrap_text(self, text):
+        return {"content": [{"type": "text", "text": text}]}
+
+    def parse_usage(self, usage):
+        return (usage.get("cache_read_input_tokens") or 0, usage.get("cache_creation_input_tokens") or 0,
+                usage.get("input_tokens") or 0, usage.get("output_tokens") or 0)
+
+    def parse_stream_usage(self, event):
+        # input counts arrive in message_start, the output count in message_delta
+        if event.get("type") == "message_start":
+            return event.get("message", {}).get("usage")
+        if event.get("type") == "message_delta":
+            return {"output_tokens": event.get("usage", {}).get("output_tokens")}
+        return None
+
+
+class DeepSeekProvider(Provider):
+    name = "deepseek"
+    label = "DeepSeek"
+    default_model = "deepseek-chat"
+    base_url = "https://api.deepseek.com"
+    api_path = "/v1/chat/completions"
+    api_key_env = "DEEPSEEK_API_KEY"
+
+    def headers(self):
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+    def extract_text(self, result):
+        if result and result.get("choices"):
+            return result["choices"][0].get("message", {}).get("content")
+        return None
+
+    def parse_stream_event(self, event):
+        choices = event.get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content")
+
+    def wrap_text(self, text):
+        return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+    def parse_usage(self, usage):
+        # DeepSeek caches shared prefixes on its own and reports hits and misses
+        return (usage.get("prompt_cache_hit_tokens") or 0, 0,
+                usage.get("prompt_cache_miss_tokens", usage.get("prompt_tokens")) or 0,
+                usage.get("completion_tokens") or 0)
+
+    def stream_options(self):
+        # without include_usage a stream carries no token counts
+        return {"stream": True, "stream_options": {"include_usage": True}}
+
+
+# cancel() reaches into urllib3's response internals for the socket; these
+# are the urllib3 major versions whose layout it has been checked against
+# (1.26 and 2.x). Anything else falls back to close() with a warning.
+SUPPORTED_URLLIB3 = (1, 2)
+
+
+def cancel(response):
+    """
+    Cancels a streamed response from another thread. close() alone leaves a
+    reader blocked on the socket until the next delta arrives, so the
+    connection is shut down first to wake it straight away.
+    """
+    sock = _response_socket(response)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass    # already closed
+    elif not response.raw.closed:
+        warnings.warn(f"cannot reach the socket of a streamed response under urllib3 {urllib3.__version__}; "
+                      f"cancelled streams stop at their next delta", RuntimeWarning)
+    response.close()
+
+
+def _response_socket(response):
+    """The socket under a streamed response, or None if it cannot be found."""
+    if int(urllib3.__version__.split(".")[0]) not in SUPPORTED_URLLIB3:
+        return None
+    raw = response.raw
+    sock = getattr(getattr(raw, "_connection", None), "sock", None)
+    if sock is None:
+        # a "Connection: close" reply detaches its socket from the connection;
+        # it is still open under the response's file object
+        sock = getattr(getattr(getattr(getattr(raw, "_fp", None), "fp", None), "raw", None), "_sock", None)
+    return sock if isinstance(sock, socket.socket) else None
+
+
+def _full_prompt(prompt, system):
+    """System prefix and prompt as one text, for cache keys and token estimates."""
+    return f"{system}\n\n{prompt}" if system else prompt
+
+
+# ============ REGISTRY ============
+
+PROVIDERS = {
+    ClaudeProvider.label: ClaudeProvider,
+    DeepSeekProvider.label: DeepSeekProvider,
+}
+
+
+def register(provider_class):
+    """Adds a Provider subclass so it can be selected by its label."""
+    PROVIDERS[provider_class.label] = provider_class
+    return provider_class
+
+
+def get_provider_class(label):
+    """Looks up a provider by label, ignoring case."""
+    for key, provider_class in PROVIDERS.items():
+        if key.lower() == (label or "").lower():
+            return provider_class
+    raise KeyError(f"Unknown LLM provider: {label} (choose from {', '.join(PROVIDERS)})")
+
+
+def get_provider(label, api_key, model=None, base_url=None, route=None):
+    """Builds a provider instance from its label."""
+    return get_provider_class(label)(api_key, model=model, base_url=base_url, route=route)
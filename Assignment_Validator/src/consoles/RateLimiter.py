@@ -0,0 +1,219 @@
+# Client-side rate limiting and retry shared by every LLM connector
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding up to one minute of budget."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """
+        Takes amount from the bucket and returns how long the caller must
+        sleep before using it. The bucket may go negative, so concurrent
+        callers queue up behind each other instead of all waking at once.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def charge(self, amount):
+        """Takes amount spent after the fact; later reserve() calls wait it off."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Enforces requests/min and tokens/min budgets for one provider and retries
+    throttled or failed calls with jittered exponential backoff.
+    """
+
+    def __init__(self, name, requests_per_min=None, tokens_per_min=None,
+                 max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_min) if requests_per_min else None
+        self.token_bucket = TokenBucket(tokens_per_min) if tokens_per_min else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def acquire(self, tokens=0):
+        """Blocks until both budgets allow another request of this size."""
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket and tokens:
+            wait = max(wait, self.token_bucket.reserve(tokens))
+        wait = max(wait, self.blocked_until - time.monotonic())
+
+        if wait > 0:
+            self._count("wait_seconds", wait)
+            time.sleep(wait)
+
+    def charge(self, tokens):
+        """
+        Debits tokens a finished call used beyond its reservation (its output).
+        Requests reserve only their input, since reserving the max_tokens
+        output ceiling up front throttled runs far below the real limit.
+        """
+        if self.token_bucket and tokens:
+            self.token_bucket.charge(tokens)
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt (starting at 1)."""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        # full jitter keeps parallel workers from retrying in lockstep
+        return random.uniform(0, delay)
+
+    def pause(self, seconds):
+        """Holds back every caller of this provider, not just the throttled one."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def send(self, request, tokens=0):
+        """
+        Calls request() under the rate limit and retries 429/5xx responses
+        and connection errors.
+
+        Args:
+            request: Zero-argument callable returning a requests.Response
+            tokens: Estimated tokens the call will consume
+
+        Returns:
+            requests.Response: The last response received; the caller still
+            decides what to do with a non-2xx status
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            self._count("requests")
+
+            try:
+                response = request()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+
+            if response is not None:
+                response.retries = attempt     # read by the metrics registry
+            if response is not None and response.status_code not in RETRY_STATUS:
+                return response
+            if attempt >= self.max_retries:
+                if response is not None and response.status_code == 429:
+                    # out of retries, but still keep other callers off this
+                    # provider until the throttle window has passed
+                    self._count("throttled")
+                    self.pause(self.backoff_delay(attempt + 1, parse_retry_after(response.headers.get("retry-after"))))
+                elif response is not None:
+                    self._count("server_errors")
+                return response
+
+            attempt += 1
+            retry_after = None
+            if response is not None:
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                self._count("throttled" if response.status_code == 429 else "server_errors")
+                # a dropped streamed response keeps its pooled connection
+                # checked out until closed; with a blocking pool that starves
+                # the next attempt
+                response.close()
+
+            delay = self.backoff_delay(attempt, retry_after)
+            if response is not None and response.status_code == 429:
+                self.pause(delay)
+
+            self._count("retries")
+            self._count("backoff_seconds", delay)
+            time.sleep(delay)
+
+    def summary(self):
+        """One-line description of the counters."""
+        s = self.stats
+        return (f"{self.name}: {s['requests']} requests, {s['retries']} retries "
+                f"({s['throttled']} throttled, {s['server_errors']} server errors), "
+                f"{s['wait_seconds']:.1f}s waiting on budget, {s['backoff_seconds']:.1f}s backing off")
+
+
+def parse_retry_after(value):
+    """Parses a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(text, max_tokens=0):
+    """Rough token count (about 4 characters per token) plus any output budget to reserve."""
+    return len(text or "") // 4 + max_tokens
+
+
+# ============ PROVIDER REGISTRY ============
+
+_limiters = {}
+_registry_lock = threading.Lock()
+
+
+def configure(provider, **kwargs):
+    """Replaces the limiter for provider with one built from kwargs."""
+    with _registry_lock:
+        _limiters[provider] = RateLimiter(provider, **kwargs)
+        return _limiters[provider]
+
+
+def get_limiter(provider):
+    """Returns the shared limiter for provider, creating an unbudgeted one if needed."""
+    with _registry_lock:
+        if provider not in _limiters:
+            _limiters[provider] = RateLimiter(provider)
+        return _limiters[provider]
+
+
+def all_limiters():
+    """Returns every limiter created so far."""
+    with _registry_lock:
+        return list(_limiters.values())
@@ -0,0 +1,193 @@
+# On-disk cache of LLM responses - every payload uses temperature 0, so the
+# same (provider, model, max_tokens, prompt) always deserves the same answer
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "llm_responses.sqlite3")
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_SIZE_MB = 500
+
+
+class ResponseCache:
+    """
+    SQLite store of full API responses keyed by a hash of the request.
+    Entries older than max_age_days are dropped, and once the stored responses
+    exceed max_size_mb the least recently used ones are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 max_size_mb=DEFAULT_MAX_SIZE_MB, refresh=False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.max_size = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0, "errors": 0}
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                created REAL,
+                accessed REAL
+            )"""
+        )
+        self.db.commit()
+        self.evict()
+
+    def get(self, key):
+        """
+        Returns the cached response dict for key, or None on a miss. A
+        database error (locked by another process, disk full) counts as a
+        miss, so the call goes to the API instead of failing.
+        """
+        if self.refresh:
+            with self.lock:
+                self.stats["misses"] += 1
+            return None
+
+        with self.lock:
+            try:
+                row = self.db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None or (self.max_age and time.time() - row[1] > self.max_age):
+                    self.stats["misses"] += 1
+                    return None
+                self.db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+                self.db.commit()
+            except sqlite3.Error as e:
+                self._failed("read", e)
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+
+        return json.loads(row[0])
+
+    def put(self, key, provider, model, response):
+        """
+        Stores a successful response under key, replacing any older entry. A
+        database error only skips the store; the response is still returned.
+        """
+        data = json.dumps(response)
+        now = time.time()
+        with self.lock:
+            try:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, provider, model, data, len(data), now, now),
+                )
+                self.db.commit()
+            except sqlite3.Error as e:
+                self._failed("write", e)
+                return
+            self.stats["stores"] += 1
+
+    def _failed(self, action, error):
+        """Rolls back after a database error; the first one is reported. Called under the lock."""
+        try:
+            self.db.rollback()
+        except sqlite3.Error:
+            pass
+        self.stats["errors"] += 1
+        if self.stats["errors"] == 1:
+            print(f"Response cache {action} failed ({error}); carrying on without it")
+
+    def evict(self):
+        """Applies the age and size limits; a database error leaves them for the next run."""
+        with self.lock:
+            removed = 0
+            try:
+                if self.max_age:
+                    cursor = self.db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age,))
+                    removed += cursor.rowcount
+
+                if self.max_size:
+                    total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                    if total > self.max_size:
+                        rows = self.db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+                        doomed = []
+                        for key, size in rows:
+                            if total <= self.max_size:
+                                break
+                            doomed.append((key,))
+                            total -= size
+                        self.db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+                        removed += len(doomed)
+
+                self.db.commit()
+            except sqlite3.Error as e:
+                self._failed("eviction", e)
+                return
+            self.stats["evicted"] += removed
+
+    def close(self):
+        self.evict()
+        with self.lock:
+            self.db.close()
+
+    def summary(self):
+        """One-line description of the hit/miss counters."""
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = 100.0 * s["hits"] / lookups if lookups else 0.0
+        return (f"Cache: {s['hits']} hits, {s['misses']} misses ({rate:.1f}% hit rate), "
+                f"{s['stores']} stored, {s['evicted']} evicted"
+                + (f", {s['errors']} errors" if s["errors"] else ""))
+
+
+def make_key(provider, model, max_tokens, prompt):
+    """Content address of a request."""
+    raw = json.dumps([provider, model, max_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ============ MODULE-LEVEL CACHE ============
+# Disabled until enable() is called, so importing the connectors never touches disk
+
+_cache = None
+
+
+def enable(**kwargs):
+    """Opens the shared cache used by every connector."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = ResponseCache(**kwargs)
+    return _cache
+
+
+def get_cache():
+    """Returns the shared cache, or None if caching is off."""
+    return _cache
+
+
+def lookup(provider, model, max_tokens, prompt, read=True):
+    """
+    Returns (key, cached response) - both None when caching is off. With
+    read=False only the key is computed, so the fresh response still gets stored.
+    """
+    if _cache is None:
+        return None, None
+    key = make_key(provider, model, max_tokens, prompt)
+    if not read:
+        return key, None
+    return key, _cache.get(key)
+
+
+def store(key, provider, model, response):
+    """Saves response under a key returned by lookup()."""
+    if _cache is not None and key is not None and response is not None:
+        _cache.put(key, provider, model, response)
@@ -0,0 +1,181 @@
+# Fan-out across several API keys and models - each route has its own
+# connection pool and rate limiter, so throughput adds up across accounts
+import json
+import os
+import threading
+import time
+
+import requests
+
+from consoles import HttpPool
+from consoles import Providers
+from consoles import RateLimiter
+
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+STRATEGIES = (ROUND_ROBIN, LEAST_LOADED)
+
+
+class Route:
+    """One provider instance (a key and a model) and its share of the traffic."""
+
+    def __init__(self, provider, weight=1):
+        self.provider = provider
+        self.weight = max(float(weight), 0.0) or 1.0
+        self.in_flight = 0
+        self.current = 0.0      # smooth weighted round-robin counter
+
+    @property
+    def limiter(self):
+        return RateLimiter.get_limiter(self.provider.route)
+
+    def paused(self, now):
+        return self.limiter.blocked_until > now
+
+
+class Router:
+    """
+    Sends each call to one of several routes, weighted round-robin or to the
+    least loaded, skipping routes whose limiter is paused. A call that fails
+    with a throttle, server or connection error is retried on another route
+    instead of waiting out that route's backoff; the failed route is paused
+    briefly, and when no other route is ready the call backs off as a single
+    provider's limiter would.
+
+    Offers complete_text() like a single Provider, so callers can take either.
+    """
+
+    name = "router"
+
+    def __init__(self, routes, strategy=ROUND_ROBIN, max_attempts=6):
+        if not routes:
+            raise ValueError("Router needs at least one route")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy} (choose from {', '.join(STRATEGIES)})")
+        self.routes = routes
+        self.strategy = strategy
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.model = ",".join(dict.fromkeys(route.provider.model for route in routes))
+
+    def pick(self):
+        """Chooses the route for the next call and counts it as in flight."""
+        with self.lock:
+            now = time.monotonic()
+            ready = [route for route in self.routes if not route.paused(now)]
+            if not ready:
+                # every key is throttled: queue on the one that frees up first
+                ready = [min(self.routes, key=lambda route: route.limiter.blocked_until)]
+
+            if self.strategy == LEAST_LOADED:
+                chosen = min(ready, key=lambda route: route.in_flight / route.weight)
+            else:
+                # smooth weighted round-robin (as in nginx): no bursts to one key
+                for route in ready:
+                    route.current += route.weight
+                chosen = max(ready, key=lambda route: route.current)
+                chosen.current -= sum(route.weight for route in ready)
+
+            chosen.in_flight += 1
+            return chosen
+
+    def release(self, route):
+        with self.lock:
+            route.in_flight -= 1
+
+    def complete_text(self, prompt, use_cache=True, system=None):
+        """
+        Sends a prompt through the routes and returns the completion text, or
+        None once max_attempts calls have failed.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            route = self.pick()
+            status = None
+            try:
+                result = route.provider.complete(prompt, use_cache, system, raise_errors=True)
+                return route.provider.extract_text(result)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RateLimiter.RETRY_STATUS:
+                    print(f"{route.provider.label} API HTTP error on {route.provider.route}: {e}")
+                    return None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                pass
+            except Exception as e:
+                print(f"{route.provider.label} API error on {route.provider.route}: {e}")
+                return None
+            finally:
+                self.release(route)
+
+            if attempt < self.max_attempts:
+                self.back_off(route, attempt, throttled=status == 429)
+
+        print(f"All routes failed after {self.max_attempts} attempts")
+        return None
+
+    def back_off(self, route, attempt, throttled=False):
+        """
+        After a failed call: steers traffic off a route that returned a 5xx or
+        dropped the connection (its limiter already paused it on a 429), and
+        waits out a backoff when no other route is ready to take the retry.
+        """
+        limiter = route.limiter
+        if not throttled:
+            limiter.pause(limiter.base_delay)
+        now = time.monotonic()
+        if not any(other is not route and not other.paused(now) for other in self.routes):
+            time.sleep(limiter.backoff_delay(attempt))
+
+    def summary(self):
+        """Rate-limit counters of every route."""
+        return "\n".join(route.limiter.summary() for route in self.routes)
+
+
+def load_routes(path):
+    """
+    Reads route definitions from a JSON file: a list of objects with
+    "provider" (label, e.g. "Claude") and optionally "api_key" or
+    "api_key_env", "model", "base_url", "weight", "requests_per_min" and
+    "tokens_per_min". The key defaults to the provider's usual variable.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        entries = json.load(file)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} must hold a non-empty JSON list of routes")
+    return entries
+
+
+def build_router(entries, strategy=ROUND_ROBIN, max_retries=5, pool_size=None, read_timeout=None,
+                 default_base_url=None):
+    """
+    Creates one provider instance per route entry, each with its own limiter
+    and pool. Route limiters do not retry; the router fails over instead.
+
+    Returns:
+        Router
+    """
+    routes = []
+    for number, entry in enumerate(entries, start=1):
+        provider_class = Providers.get_provider_class(entry.get("provider"))
+        api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env") or provider_class.api_key_env)
+        if not api_key:
+            raise ValueError(f"Route {number} ({provider_class.label}) has no API key")
+
+        route_name = f"{provider_class.name}#{number}"
+        RateLimiter.configure(
+            route_name,
+            requests_per_min=entry.get("requests_per_min"),
+            tokens_per_min=entry.get("tokens_per_min"),
+            max_retries=0,
+        )
+        pool_kwargs = {"pool_size": pool_size} if pool_size else {}
+        if read_timeout:
+            pool_kwargs["read_timeout"] = read_timeout
+        HttpPool.configure(route_name, **pool_kwargs)
+
+        provider = provider_class(api_key, model=entry.get("model"),
+                                  base_url=entry.get("base_url") or default_base_url, route=route_name)
+        routes.append(Route(provider, entry.get("weight", 1)))
+
+    return Router(routes, strategy, max_attempts=max_retries + 1)
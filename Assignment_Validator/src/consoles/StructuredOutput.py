@@ -0,0 +1,278 @@
+# JSON output mode - prompts ask for JSON against a declared schema, replies
+# are parsed (orjson when installed), repaired locally when malformed and
+# checked against the schema, so drifting output rarely costs a re-ask
+import json
+import re
+import threading
+
+try:
+    import orjson
+except ImportError:     # optional; the standard library parser is the fallback
+    orjson = None
+
+
+# The validator's answer set: {"answers": [{"question": 1, "answer": "..."}]}
+ANSWER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answers": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "integer"},
+                    "answer": {"type": "string"},
+                },
+                "required": ["question", "answer"],
+            },
+        },
+    },
+    "required": ["answers"],
+}
+
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```\s*$")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "null": type(None),
+}
+
+_stats = {"parsed": 0, "repaired": 0, "invalid": 0}
+_stats_lock = threading.Lock()
+
+
+def schema_instructions(schema):
+    """Prompt text asking for a reply that is only JSON matching schema."""
+    return ("Respond with a single JSON value and nothing else - no prose, no markdown fences. "
+            "It must match this JSON Schema:\n" + json.dumps(schema, indent=2))
+
+
+def loads(text):
+    """json.loads, through orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def repair(text):
+    """
+    Best-effort fix of the usual ways model JSON goes wrong: markdown fences,
+    prose around the value, trailing commas, Python literals and output cut
+    off mid-value (open strings and brackets are closed).
+
+    Returns:
+        str: Text that has a better chance of parsing; may still be invalid
+    """
+    text = _FENCE.sub("", text.strip())
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return text
+    text = text[min(starts):]
+
+    # one pass tracking strings and brackets: drops prose after the value,
+    # swaps Python literals outside strings, and records what is still open
+    out = []
+    stack = []
+    in_string = False
+    escaped = False
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                break
+        else:
+            for literal, replacement in _PY_LITERALS.items():
+                end = index + len(literal)
+                if (text.startswith(literal, index) and not text[index - 1:index].isalnum()
+                        and not text[end:end + 1].isalnum()):
+                    out.append(replacement)
+                    index += len(literal)
+                    break
+            else:
+                out.append(char)
+                index += 1
+            continue
+        index += 1
+
+    repaired = "".join(out)
+    if in_string:
+        repaired += '"'
+    if stack:
+        # a value cut off after a key or a comma cannot be finished; drop it
+        repaired = re.sub(r'(,\s*"[^"]*"\s*:?\s*|,\s*|:\s*)$', "", repaired.rstrip())
+        repaired += "".join(reversed(stack))
+    return _TRAILING_COMMA.sub(r"\1", repaired)
+
+
+def validate(value, schema, path="$"):
+    """
+    Checks value against the subset of JSON Schema used here: type,
+    properties, required, items and enum.
+
+    Returns:
+        list: Error messages; empty if value matches
+    """
+    errors = []
+    expected = schema.get("type")
+    if expected:
+        types = _TYPES.get(expected)
+        # bool is an int subclass in Python but not a JSON number
+        wrong_bool = isinstance(value, bool) and expected in ("integer", "number")
+        if types is None or not isinstance(value, types) or wrong_bool:
+            return [f"{path}: expected {expected}"]
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: not one of {schema['enum']}")
+
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}: missing {key}")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], subschema, f"{path}.{key}"))
+    elif isinstance(value, list) and "items" in schema:
+        for position, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{position}]"))
+    return errors
+
+
+def parse(text, schema=None):
+    """
+    Parses a JSON reply, repairing it first if it does not parse as is.
+
+    Returns:
+        tuple: (value or None, list of errors); an empty error list means the
+        value parsed and matches schema
+    """
+    if not text or not text.strip():
+        return None, ["empty response"]
+
+    repaired = False
+    try:
+        value = loads(text)
+    except ValueError:
+        try:
+            value = loads(repair(text))
+            repaired = True
+        except ValueError as e:
+            _count("invalid")
+            return None, [f"not JSON: {e}"]
+
+    errors = validate(value, schema) if schema else []
+    _count("invalid" if errors else "repaired" if repaired else "parsed")
+    return value, errors
+
+
+def parse_answer_set(text):
+    """
+    Reads a validator answer set in the ANSWER_SCHEMA shape.
+
+    Returns:
+        dict: {question number: answer text}; empty if text is not a usable
+        answer set
+    """
+    value, errors = parse(text, ANSWER_SCHEMA)
+    if value is None:
+        return {}
+    if errors:
+        # keep the well-formed entries of a partly valid set
+        if not isinstance(value, dict) or not isinstance(value.get("answers"), list):
+            return {}
+    answers = {}
+    for item in value["answers"]:
+        if not isinstance(item, dict):
+            continue
+        number = item.get("question")
+        if isinstance(number, str) and number.strip().lstrip("Qq").isdigit():
+            number = int(number.strip().lstrip("Qq"))     # "3" or "Q3" instead of 3
+        if isinstance(number, int) and not isinstance(number, bool) and isinstance(item.get("answer"), str):
+            answers[number] = item["answer"].strip()
+    return answers
+
+
+def looks_like_json(text):
+    """True if a reply starts like a JSON value (or a fenced one)."""
+    return (text or "").lstrip()[:1] in ("{", "[", "`")
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def summary():
+    """Counts of replies parsed as is, repaired locally, and still invalid."""
+    with _stats_lock:
+        return (f"JSON output: {_stats['parsed']} parsed, {_stats['repaired']} repaired locally, "
+                f"{_stats['invalid']} invalid")
+
+
+class StreamScanner:
+    """
+    Follows a streamed JSON reply one delta at a time, without re-parsing
+    what came before: tracks string and bracket state and counts objects
+    completed at a given depth (depth 3 = items of {"answers": [...]}).
+    """
+
+    def __init__(self, item_depth=3):
+        self.item_depth = item_depth
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.off_format = False
+        self.items = 0
+        self.seen = 0
+
+    def feed(self, delta):
+        for char in delta:
+            self.seen += 1
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            if not self.started:
+                if char.isspace() or char == "`" or (self.seen <= 16 and char.isalpha()):
+                    continue    # whitespace or an opening ```json fence
+                if char in "{[":
+                    self.started = True
+                else:
+                    self.off_format = True
+                    return
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                if char == "}" and self.depth == self.item_depth:
+                    self.items += 1
+                self.depth -= 1
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the validator imports its shared modules as the top-level "consoles" package;
+# the stand-in LLM server lives with the benchmarks, the CSV runner in Carlson_scripts
+sys.path.insert(0, os.path.join(ROOT, "Assignment_Validator", "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, os.path.join(ROOT, "Carlson_scripts"))
+
+
+@pytest.fixture
+def mock_server():
+    """The mock LLM server on a free port; yields (server, base_url)."""
+    from mock_llm_server import start_server
+
+    server, base_url = start_server(batch_delay=0.0)
+    yield server, base_url
+    server.shutdown()
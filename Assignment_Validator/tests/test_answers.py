@@ -0,0 +1,73 @@
+from consoles import Answers
+
+
+def test_long_answers_with_different_numbers_need_the_judge():
+    a = "The area of the rectangular garden is 144 square meters in total"
+    b = "The area of the rectangular garden is 148 square meters in total"
+    assert Answers.compare_answer(a, b) == Answers.AMBIGUOUS
+
+
+def test_long_answers_with_antonym_prefixes_need_the_judge():
+    a = "The function is increasing on the whole interval from zero to one"
+    b = "The function is decreasing on the whole interval from zero to one"
+    assert Answers.compare_answer(a, b) == Answers.AMBIGUOUS
+
+
+def test_long_answers_with_one_sided_negation_need_the_judge():
+    a = "The statement is true because every even number above two is composite"
+    b = "The statement is not true because every even number above two is composite"
+    assert Answers.compare_answer(a, b) == Answers.AMBIGUOUS
+
+
+def test_long_answers_with_contracted_negation_need_the_judge():
+    a = "The series converges since the terms shrink faster than one over n squared"
+    b = "The series doesn't converge since the terms shrink faster than one over n squared"
+    assert Answers.compare_answer(a, b) == Answers.AMBIGUOUS
+
+
+def test_long_answers_differing_in_one_content_word_need_the_judge():
+    a = "The capital of Australia is Sydney, located on the east coast"
+    b = "The capital of Australia is Canberra, located on the east coast"
+    assert Answers.compare_answer(a, b) == Answers.AMBIGUOUS
+
+    a = "The organelle responsible for producing energy in the cell is the mitochondria"
+    b = "The organelle responsible for producing energy in the cell is the chloroplast"
+    assert Answers.compare_answer(a, b) == Answers.AMBIGUOUS
+
+
+def test_long_answers_with_equal_numbers_written_differently_match():
+    a = "The probability that both coins land on heads is 0.25 overall"
+    b = "The probability that both coins land on heads is 0.250 overall"
+    assert Answers.compare_answer(a, b) == Answers.MATCH
+
+
+def test_long_answers_differing_in_filler_still_match():
+    a = "The total area of the rectangular garden is 144 square meters"
+    b = "The area of the rectangular garden is 144 square meters"
+    assert Answers.compare_answer(a, b) == Answers.MATCH
+
+
+def test_short_numeric_answers():
+    assert Answers.compare_answer("12", "12.0") == Answers.MATCH
+    assert Answers.compare_answer("12", "15") == Answers.MISMATCH
+
+
+def test_choice_answers():
+    assert Answers.compare_answer("(b)", "B. 42") == Answers.MATCH
+    assert Answers.compare_answer("a", "c") == Answers.MISMATCH
+
+
+def test_ambiguous_answer_is_not_verified_without_the_judge():
+    verdicts = Answers.compare_answer_sets(
+        {1: "The statement is true because every even number above two is composite"},
+        {1: "The statement is not true because every even number above two is composite"},
+    )
+    assert verdicts == {1: Answers.AMBIGUOUS}
+
+
+def test_json_chunk_replies_are_parsed_separately():
+    chunks = [
+        '{"answers": [{"question": 1, "answer": "4"}, {"question": 2, "answer": "Paris"}]}',
+        '```json\n{"answers": [{"question": 3, "answer": "7"}]}\n```',
+    ]
+    assert Answers.parse_chunk_answers(chunks) == {1: "4", 2: "Paris", 3: "7"}
@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import LLMs_Console
+
+
+def test_dedup_shares_an_in_flight_call():
+    dedup = LLMs_Console.Deduplicator()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    first = []
+    owner = threading.Thread(target=lambda: first.append(dedup.run("key", call)))
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=lambda: first.append(dedup.run("key", call)))
+    waiter.start()
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert first == ["answer", "answer"]
+    assert len(calls) == 1
+    assert dedup.saved == 1
+    assert not dedup.in_flight
+
+
+def test_dedup_keeps_only_recent_answers():
+    dedup = LLMs_Console.Deduplicator(max_answers=2)
+    for key in ("a", "b", "c"):
+        dedup.run(key, lambda key=key: key.upper())
+
+    assert list(dedup.answers) == ["b", "c"]
+    assert dedup.run("b", lambda: "called again") == "B"
+    assert dedup.run("a", lambda: "called again") == "called again"
+
+
+def test_dedup_does_not_keep_failed_answers():
+    dedup = LLMs_Console.Deduplicator()
+    assert dedup.run("key", lambda: "") == ""
+    assert dedup.run("key", lambda: "retried") == "retried"
+
+
+def test_row_window_bounds_rows_in_flight_across_batches():
+    executor = ThreadPoolExecutor(max_workers=4)
+    window = LLMs_Console.RowWindow(executor, 3)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def row(_):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    for batch in range(4):
+        for item in range(2):      # batches smaller than the window do not hold it back
+            window.submit(row, item)
+    window.wait()
+    executor.shutdown()
+
+    assert peak[0] == 3
+
+
+def test_row_window_reraises_a_failed_row():
+    executor = ThreadPoolExecutor(max_workers=2)
+    window = LLMs_Console.RowWindow(executor, 2)
+
+    def fail(_):
+        raise ValueError("row failed")
+
+    window.submit(fail, 0)
+    with pytest.raises(ValueError):
+        window.wait()
+    executor.shutdown()
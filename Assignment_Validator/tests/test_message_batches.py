@@ -0,0 +1,102 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import ROOT
+from consoles import MessageBatches
+from consoles import Providers
+
+
+CSV_SCRIPT = os.path.join(ROOT, "Carlson_scripts", "LLMs_Console.py")
+
+
+def test_claude_batch_round_trip(mock_server):
+    _, base_url = mock_server
+    client = MessageBatches.get_client("claude", "test", base_url)
+    provider = Providers.ClaudeProvider("test")
+    batch_id = client.submit([("row-0", provider.build_payload("hello")), ("row-1", provider.build_payload("world"))])
+
+    MessageBatches.wait(client, batch_id, poll_interval=0.05)
+    results = client.results(batch_id)
+    assert set(results) == {"row-0", "row-1"}
+    assert "hello" in provider.extract_text(results["row-0"])
+
+
+def test_deepseek_batch_round_trip_through_a_gateway(mock_server):
+    _, base_url = mock_server
+    client = MessageBatches.get_client("deepseek", "test", base_url)
+    provider = Providers.DeepSeekProvider("test")
+    batch_id = client.submit([("row-0", provider.build_payload("hello"))])
+
+    MessageBatches.wait(client, batch_id, poll_interval=0.05)
+    assert "hello" in provider.extract_text(client.results(batch_id)["row-0"])
+
+
+def test_deepseek_batch_needs_a_base_url():
+    with pytest.raises(ValueError):
+        MessageBatches.get_client("deepseek", "test")
+
+
+def _run_csv(tmp_path, base_url, *extra, wait=True, mode="batch"):
+    command = [sys.executable, CSV_SCRIPT, "--input", str(tmp_path / "in.csv"), "--output", str(tmp_path / "out.csv"),
+               "--LLM_model", "Claude", "--api_key", "test", "--base_url", base_url, "--mode", mode,
+               "--poll_interval", "0.1", "--no-cache", *extra]
+    if wait:
+        return subprocess.run(command, capture_output=True, text=True, timeout=60)
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def test_resume_polls_the_submitted_batch_instead_of_resubmitting(tmp_path, mock_server):
+    server, base_url = mock_server
+    (tmp_path / "in.csv").write_text("text\n" + "".join(f"row {index}\n" for index in range(6)), encoding="utf-8")
+    journal = tmp_path / "out.csv.journal"
+
+    # crash while polling: the batch never ends until the process is gone
+    server.state.batch_delay = 3600
+    process = _run_csv(tmp_path, base_url, wait=False)
+    try:
+        deadline = time.monotonic() + 30
+        while not (journal.exists() and '"batch"' in journal.read_text(encoding="utf-8")):
+            assert time.monotonic() < deadline, "batch was never journaled"
+            time.sleep(0.05)
+    finally:
+        process.kill()
+        process.wait()
+    assert len(server.state.batches) == 1
+
+    server.state.batch_delay = 0.0
+    result = _run_csv(tmp_path, base_url, "--resume")
+    assert result.returncode == 0, result.stderr
+    assert len(server.state.batches) == 1, "resume submitted the rows again"
+
+    lines = (tmp_path / "out.csv").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 7
+    assert all("mock reply" in line for line in lines[1:])
+    assert any(json.loads(line).get("merged") for line in journal.read_text(encoding="utf-8").splitlines())
+
+
+def test_sync_resume_adds_failed_rows_once(tmp_path, mock_server):
+    server, base_url = mock_server
+    (tmp_path / "in.csv").write_text("text\n" + "".join(f"unique row {index}\n" for index in range(60)),
+                                     encoding="utf-8")
+
+    server.state.error_rate = 0.3
+    result = _run_csv(tmp_path, base_url, "--max_retries", "0", "--concurrency", "4", mode="sync")
+    assert result.returncode == 0, result.stderr
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as file:
+        first = list(csv.DictReader(file))
+    assert 0 < len(first) < 60
+    assert all(row["output"] for row in first), "a failed row was written empty"
+
+    server.state.error_rate = 0.0
+    result = _run_csv(tmp_path, base_url, "--resume", "--concurrency", "4", mode="sync")
+    assert result.returncode == 0, result.stderr
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    assert sorted(row["input"] for row in rows) == sorted(f"unique row {index}" for index in range(60))
+    assert rows[:len(first)] == first
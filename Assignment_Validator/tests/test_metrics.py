@@ -0,0 +1,24 @@
+import json
+import time
+
+from consoles import Metrics
+
+
+def test_calls_reach_the_metrics_file_as_they_are_recorded(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    Metrics.reset()
+    Metrics.open_jsonl(str(path))
+    try:
+        Metrics.record("claude", "model", "complete", time.monotonic(), usage=(0, 0, 100, 20))
+        Metrics.record("claude", "model", "complete", time.monotonic(), cached=True)
+
+        # on disk before the run ends, so a crash loses nothing
+        entries = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [entry["cached"] for entry in entries] == [False, True]
+    finally:
+        Metrics.close_jsonl()
+
+    assert Metrics.totals()["calls"] == 2
+    assert "claude: 2 calls (1 from cache, 0 failed)" in Metrics.summary()
+    assert "input 0 cached + 100 uncached, output 20 tokens" in Metrics.summary()
+    Metrics.reset()
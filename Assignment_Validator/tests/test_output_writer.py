@@ -0,0 +1,104 @@
+import csv
+import json
+import os
+
+import pytest
+
+import LLMs_Console
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file))
+
+
+def test_rows_finishing_out_of_order_are_written_in_input_order(tmp_path):
+    output = str(tmp_path / "out.csv")
+    checkpoint = LLMs_Console.Checkpoint(output)
+    writer = LLMs_Console.OutputWriter(output, checkpoint=checkpoint)
+
+    writer.expect([0, 1, 2, 3])
+    for index in (2, 0, 3, 1):
+        checkpoint.record(index, f"answer {index}")
+        writer.put(index, f"row {index}", f"answer {index}")
+    writer.close()
+    checkpoint.close()
+
+    assert [row["input"] for row in _read_csv(output)] == ["row 0", "row 1", "row 2", "row 3"]
+    assert LLMs_Console.Checkpoint(output, resume=True).written == {0, 1, 2, 3}
+
+
+def test_rows_behind_an_unfinished_row_stay_in_the_journal(tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    checkpoint = LLMs_Console.Checkpoint(output)
+    writer = LLMs_Console.OutputWriter(output, checkpoint=checkpoint)
+
+    writer.expect([0, 1, 2])
+    for index in (0, 2):     # row 1 never finishes, as when a run is killed
+        checkpoint.record(index, f"answer {index}")
+        writer.put(index, f"row {index}", f"answer {index}")
+    writer.close()
+    checkpoint.close()
+
+    with open(output, encoding="utf-8") as file:
+        assert [json.loads(line)["input"] for line in file] == ["row 0"]
+    resumed = LLMs_Console.Checkpoint(output, resume=True)
+    assert resumed.written == {0}
+    assert resumed.done == {2: "answer 2"}
+
+
+def test_failed_rows_are_left_out_and_retried_on_resume(tmp_path):
+    output = str(tmp_path / "out.csv")
+    checkpoint = LLMs_Console.Checkpoint(output)
+    writer = LLMs_Console.OutputWriter(output, checkpoint=checkpoint)
+
+    writer.expect([0, 1, 2])
+    for index, answer in ((0, "answer 0"), (1, ""), (2, "answer 2")):
+        checkpoint.record(index, answer)
+        writer.put(index, f"row {index}", answer)
+    writer.close()
+    checkpoint.close()
+
+    assert [row["input"] for row in _read_csv(output)] == ["row 0", "row 2"]
+    resumed = LLMs_Console.Checkpoint(output, resume=True)
+    assert resumed.written == {0, 2}
+    assert 1 not in resumed.done
+
+
+def test_journal_replay_skips_a_torn_line_and_tracks_batches(tmp_path):
+    output = str(tmp_path / "out.csv")
+    checkpoint = LLMs_Console.Checkpoint(output)
+    checkpoint.record_batch("batch-a", (0, 9), {"3": 1})
+    checkpoint.record_batch("batch-b", (10, 19), {})
+    checkpoint.mark_merged((0, 9))
+    checkpoint.record(12, "answer 12")
+    checkpoint.close()
+    with open(checkpoint.path, "a", encoding="utf-8") as file:
+        file.write('{"row": 13, "outp')     # crash mid-write
+
+    resumed = LLMs_Console.Checkpoint(output, resume=True)
+    assert resumed.batches == {(10, 19): ("batch-b", {})}
+    assert resumed.done == {12: "answer 12"}
+    resumed.close()
+
+    # without --resume the journal starts over
+    fresh = LLMs_Console.Checkpoint(output)
+    fresh.close()
+    assert os.path.getsize(fresh.path) == 0
+
+
+def test_parquet_parts_continue_numbering_after_a_restart(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    output = str(tmp_path / "out.parquet")
+    for run in range(2):
+        writer = LLMs_Console.OutputWriter(output, parquet_rows=2)
+        rows = range(run * 3, run * 3 + 3)
+        writer.expect(rows)
+        for index in rows:
+            writer.put(index, f"row {index}", f"answer {index}")
+        writer.close()
+
+    assert sorted(os.listdir(output)) == [f"part-{part:05d}.parquet" for part in range(4)]
+    assert sorted(pd.read_parquet(output)["input"]) == sorted(f"row {index}" for index in range(6))
@@ -0,0 +1,92 @@
+import socket
+import sqlite3
+import threading
+import time
+import warnings
+
+import pytest
+import requests
+
+from consoles import Providers
+from consoles import ResponseCache
+
+
+def test_stream_reads_the_whole_reply(mock_server):
+    _, base_url = mock_server
+    provider = Providers.ClaudeProvider("test", base_url=base_url)
+    assert "hello" in "".join(provider.stream("hello", use_cache=False))
+
+
+def test_closing_the_response_cancels_a_stream_before_its_first_token(mock_server):
+    server, base_url = mock_server
+    server.state.latency = 30.0
+    provider = Providers.DeepSeekProvider("test", base_url=base_url)
+    responses = []
+
+    start = time.monotonic()
+    deltas = provider.stream("hello", use_cache=False, on_response=responses.append)
+    reader = threading.Thread(target=lambda: list(_ignore_errors(deltas)))
+    reader.start()
+    while not responses:
+        time.sleep(0.01)
+    Providers.cancel(responses[0])
+    reader.join(timeout=5)
+
+    assert not reader.is_alive()
+    assert time.monotonic() - start < 5
+
+
+@pytest.mark.parametrize("stream", [True, False], ids=["event-stream", "keep-alive"])
+def test_the_socket_is_found_for_both_response_shapes(mock_server, stream):
+    # an event stream ends with "Connection: close", which detaches the socket
+    # from urllib3's connection; a keep-alive reply leaves it attached
+    _, base_url = mock_server
+    payload = Providers.ClaudeProvider("test").build_payload("hello")
+    payload["stream"] = stream
+    response = requests.post(base_url + "/v1/messages", json=payload, stream=True)
+    try:
+        assert isinstance(Providers._response_socket(response), socket.socket)
+    finally:
+        response.close()
+
+
+def test_an_unsupported_urllib3_falls_back_to_close_with_a_warning(mock_server, monkeypatch):
+    _, base_url = mock_server
+    monkeypatch.setattr(Providers, "SUPPORTED_URLLIB3", ())
+    response = requests.post(base_url + "/v1/messages", json=Providers.ClaudeProvider("test").build_payload("hi"),
+                             stream=True)
+
+    with pytest.warns(RuntimeWarning):
+        Providers.cancel(response)
+    assert response.raw.closed
+
+    # a response already read to the end has nothing left to cancel
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        Providers.cancel(response)
+
+
+def _ignore_errors(deltas):
+    try:
+        yield from deltas
+    except Exception:
+        pass
+
+
+def test_a_locked_cache_does_not_lose_a_paid_call(mock_server, tmp_path):
+    _, base_url = mock_server
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache.enable(path=path)
+    cache.db.execute("PRAGMA busy_timeout = 50")
+    holder = sqlite3.connect(path)
+    holder.execute("BEGIN EXCLUSIVE")
+    try:
+        provider = Providers.ClaudeProvider("test", base_url=base_url)
+        assert "hello" in provider.complete_text("hello")
+        assert "hello" in "".join(provider.stream("hello again"))
+        assert cache.stats["errors"] > 0
+    finally:
+        holder.rollback()
+        holder.close()
+        cache.close()
+        ResponseCache._cache = None
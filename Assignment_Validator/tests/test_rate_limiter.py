@@ -0,0 +1,58 @@
+import time
+
+from consoles import HttpPool
+from consoles import RateLimiter
+
+
+PAYLOAD = {"model": "mock", "max_tokens": 10, "messages": [{"role": "user", "content": "hello"}]}
+
+
+def test_token_bucket_waits_once_the_budget_is_spent():
+    bucket = RateLimiter.TokenBucket(per_minute=60)     # one per second
+    assert bucket.reserve(60) == 0.0
+    assert 0.9 < bucket.reserve(1) <= 1.0
+
+    bucket = RateLimiter.TokenBucket(per_minute=60)
+    bucket.charge(30)   # output of a finished call, settled afterwards
+    assert bucket.reserve(30) == 0.0
+    assert bucket.reserve(30) > 29
+
+
+def test_send_retries_server_errors_then_gives_up(mock_server):
+    server, base_url = mock_server
+    server.state.error_rate = 1.0
+    limiter = RateLimiter.RateLimiter("test-5xx", max_retries=3, base_delay=0.01)
+    pool = HttpPool.get_pool("test-5xx")
+
+    response = limiter.send(lambda: pool.post(base_url + "/v1/messages", json=PAYLOAD))
+    assert response.status_code == 500
+    assert server.state.stats["calls"] == 4
+    assert limiter.stats["retries"] == 3
+    assert limiter.stats["server_errors"] == 4
+
+
+def test_send_recovers_once_the_server_does(mock_server):
+    server, base_url = mock_server
+    limiter = RateLimiter.RateLimiter("test-recover", max_retries=5, base_delay=0.01)
+    pool = HttpPool.get_pool("test-recover")
+    attempts = []
+
+    def request():
+        # the first two attempts fail, the third succeeds
+        server.state.error_rate = 1.0 if len(attempts) < 2 else 0.0
+        attempts.append(1)
+        return pool.post(base_url + "/v1/messages", json=PAYLOAD)
+
+    assert limiter.send(request).status_code == 200
+    assert len(attempts) == 3
+
+
+def test_a_final_429_pauses_every_caller(mock_server):
+    server, base_url = mock_server
+    server.state.burst_every = server.state.burst_length = 600     # always throttled
+    limiter = RateLimiter.RateLimiter("test-429", max_retries=0, max_delay=0.5)
+    pool = HttpPool.get_pool("test-429")
+
+    response = limiter.send(lambda: pool.post(base_url + "/v1/messages", json=PAYLOAD))
+    assert response.status_code == 429
+    assert limiter.blocked_until > time.monotonic()
@@ -0,0 +1,59 @@
+import time
+
+from consoles import Providers
+from consoles import RateLimiter
+from consoles import Router
+
+
+def _route(name, base_url, base_delay=0.05):
+    RateLimiter.configure(name, max_retries=0, base_delay=base_delay)
+    return Router.Route(Providers.ClaudeProvider("test", base_url=base_url, route=name))
+
+
+def test_a_failing_route_fails_over_to_a_healthy_one(mock_server):
+    server, base_url = mock_server
+    from mock_llm_server import start_server
+
+    failing, failing_url = start_server(error_rate=1.0)
+    try:
+        router = Router.Router([_route("claude#down", failing_url, base_delay=30), _route("claude#up", base_url)])
+        start = time.monotonic()
+        for _ in range(3):
+            assert "hello" in router.complete_text("hello", use_cache=False)
+        # the failed route is paused, not waited on
+        assert time.monotonic() - start < 5
+        assert failing.state.stats["calls"] == 1
+    finally:
+        failing.shutdown()
+
+
+def test_a_single_failing_route_backs_off_between_attempts(mock_server):
+    server, base_url = mock_server
+    server.state.error_rate = 1.0
+    router = Router.Router([_route("claude#only", base_url, base_delay=0.2)], max_attempts=4)
+
+    start = time.monotonic()
+    assert router.complete_text("hello", use_cache=False) is None
+    assert server.state.stats["calls"] == 4
+    # each retry waits at least out the route's pause after a 5xx
+    assert time.monotonic() - start >= 3 * 0.2
+
+
+def test_a_client_error_is_not_retried(mock_server):
+    server, base_url = mock_server
+    # unknown path: the mock answers 404, which no other route would fix
+    router = Router.Router([_route("claude#bad", base_url + "/bogus"), _route("claude#good", base_url)])
+    assert router.complete_text("hello", use_cache=False) is None
+    assert server.state.stats["calls"] == 0
+
+
+def test_with_every_route_paused_the_one_freeing_first_is_picked(mock_server):
+    _, base_url = mock_server
+    soon, later = _route("claude#soon", base_url), _route("claude#later", base_url)
+    router = Router.Router([later, soon])
+    later.limiter.pause(60)
+    soon.limiter.pause(30)
+
+    route = router.pick()
+    router.release(route)
+    assert route is soon
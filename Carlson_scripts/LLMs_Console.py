@@ -2,9 +2,17 @@
 # this script gets texts or data from CSV file and evalauate 
 # how the script outputs its data needs to be changed depending on project// can be change at batch_processing func
 import os
+import sys
 import csv
 import json
+import hashlib
 import argparse
+import itertools
+import threading
+import time
+import queue
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
 import pandas as pd
 import requests
 import re
@@ -13,146 +21,741 @@ from dotenv import load_dotenv
 import anthropic
 import requests
 
+# connectors shared with the Assignment Validator
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Assignment_Validator", "src"))
+from consoles import HttpPool
+from consoles import MessageBatches
+from consoles import Metrics
+from consoles import Providers
+from consoles import RateLimiter
+from consoles import ResponseCache
+from consoles import Router
+from consoles import StructuredOutput
 
 
 
-#Open csv File
-def load_csv(file_path):
-    
-    try:
-        file = pd.read_csv(file_path,encoding = "utf-8")
-        return file
-    
-    except Exception as e:
-        return None
-    
-# Open txt file
-
-def open_txt(file_path):
+# Stream csv file in batches
 
+def load_csv_batches(file_path, batch_size, start_row=0, end_row=None):
+    # rows before start_row are only tokenized by the csv module, never turned
+    # into DataFrames, and at most one batch is held in memory at a time
     try:
-        with open(file_path,'r') as file:
-            content = file.read()
-            return content
+        file = open(file_path, 'r', newline='', encoding='utf-8')
+        reader = csv.DictReader(file)
+        reader.fieldnames  # reads the header now so a bad file fails here
     except Exception as e:
         return None
 
+    return _csv_batches(file, reader, batch_size, start_row, end_row)
 
 
-# Get Prompt
-
-def create_prompt(other_notes):
-    prompt =" "
-
-
-    return prompt + other_notes
+def _csv_batches(file, reader, batch_size, start_row, end_row):
+    with file:
+        rows = itertools.islice(reader, start_row, end_row)
+        index = start_row
+        while True:
+            chunk = list(itertools.islice(rows, batch_size))
+            if not chunk:
+                break
+            # index matches the row number in the input, as df.iloc[...] kept it
+            yield pd.DataFrame(chunk, index=range(index, index + len(chunk)), columns=reader.fieldnames)
+            index += len(chunk)
 
-# connect to DeepSeek 
-
-def DeepSeek_Connect(api_key,prompt,other_notes,model='deepseek-chat'):
-
-    prompt = create_prompt(prompt,other_notes=other_notes)
 
+def count_rows(file_path, start_row=0, end_row=None):
+    """
+    Data rows of the CSV in [start_row, end_row), for the progress total;
+    None if unreadable. Reading stops at end_row, so a small slice of a big
+    file is counted without reading the rest of it.
+    """
     try:
-        api_url = "https://api.deepseek.com/v1/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-
-        payload = {
-            "model": model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 4000,
-            "temperature": 0
-        }
-
-        response = requests.post(api_url,headers=headers,json=payload)
-        response.raise_for_status()
-
-        result = response.json()
-        return result
-
+        with open(file_path, 'r', newline='', encoding='utf-8') as file:
+            limit = end_row + 1 if end_row is not None else None    # plus the header
+            rows = sum(1 for _ in itertools.islice(csv.reader(file), limit)) - 1
     except Exception as e:
-        print("Error calling DeepSeek API")
         return None
-    
+    return max(rows - start_row, 0)
 
-# connect to Claude 
+# Open txt file
 
-def Claude_Connect(api_key,prompt,other_notes,model = 'claude-sonnet-4-5-20250929'):
-    
-    prompt = create_prompt(prompt,other_notes=other_notes)
+def open_txt(file_path):
 
     try:
+        with open(file_path,'r') as file:
+            content = file.read()
+            return content
+    except Exception as e:
+        return None
 
-        api_url = "https://api.anthropic.com/v1/messages"
-
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": api_key,                # not "Authorization: Bearer"
-            "anthropic-version": "2023-06-01"    # required
-        }
-
-        payload = {
-            "model": model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 4000,
-            "temperature": 0
-        }
 
-        response = requests.post(api_url,headers=headers,json=payload)
-        response.raise_for_status()
 
-        result = response.json()
-        return result
+# Get Prompt
 
-    except Exception as e:
-        print("Error calling Claude API")
+def create_prompt(prompt, other_notes, schema=None):
+    """
+    Returns (system, prompt). The instructions, --other_notes and the
+    --json_schema request are the same for every row, so they go in the
+    system block the provider can cache.
+    """
+    instructions =" "
+
+
+    system = (instructions + other_notes).strip()
+    if schema is not None:
+        system = (system + "\n\n" + StructuredOutput.schema_instructions(schema)).strip()
+    return system or None, prompt
+
+# Send one row through the selected provider
+
+def process_row(provider, prompt, other_notes, schema=None, json_retries=1):
+    """
+    Sends one row's prompt to the LLM (a Provider or a Router) and returns the
+    output text. With a schema the reply is parsed, repaired locally if needed
+    and stored as compact JSON; only a reply that still does not match is
+    asked again, up to json_retries times, and kept as raw text after that.
+    """
+    system, user_prompt = create_prompt(prompt, other_notes=other_notes, schema=schema)
+    text = provider.complete_text(user_prompt, system=system) or ''
+    if schema is None:
+        return text
+
+    for attempt in range(json_retries + 1):
+        if attempt:
+            # the same prompt would come back from the response cache
+            text = provider.complete_text(user_prompt, use_cache=False, system=system) or ''
+        output = structured_output(text, schema)
+        if output is not None:
+            return output
+    return text
+
+
+def structured_output(text, schema):
+    """Compact JSON for a reply matching schema, or None if it cannot be made to."""
+    value, errors = StructuredOutput.parse(text, schema)
+    if value is None or errors:
         return None
-    
-def batch_processing(api_key, df_batch, output_file, llm_model, other_notes):
-    results = []  # initialize results list
-
-    for _, row in tqdm(df_batch.iterrows(), total=len(df_batch)):  # loop over rows
-        prompt = row.get('text', '')  # adjust column name as needed
-        
-        if llm_model == "Claude":
-            response = Claude_Connect(api_key, prompt, other_notes)
-            if response:
-                content = response.get('content', [{}])[0].get('text', '')
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+# In-run request deduplication
+
+def request_key(provider, prompt, other_notes):
+    """Identity of a request: rows with the same key get the same answer."""
+    return hashlib.sha256(json.dumps([provider.name, provider.model, other_notes, prompt]).encode('utf-8')).hexdigest()
+
+
+class Deduplicator:
+    """
+    Sends each distinct request once. The first row with a key makes the
+    call; later rows with the same key arriving while that call is in flight
+    wait for it and reuse the answer. Finished answers are kept only for the
+    max_answers most recently used keys, so memory stays flat on long runs;
+    an older duplicate is served by the response cache instead (or sent
+    again with --no-cache). Empty answers (failed calls) are not kept, so a
+    later duplicate tries again.
+    """
+
+    def __init__(self, max_answers=1000):
+        self.lock = threading.Lock()
+        self.in_flight = {}                         # key -> Future holding the output text
+        self.answers = collections.OrderedDict()    # key -> output text, least recently used first
+        self.max_answers = max_answers
+        self.saved = 0
+
+    def run(self, key, call):
+        with self.lock:
+            if key in self.answers:
+                self.answers.move_to_end(key)
+                self.saved += 1
+                return self.answers[key]
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self.in_flight[key] = Future()
             else:
-                content = ''
-        else:
-            response = DeepSeek_Connect(api_key, prompt, other_notes)
-            if response:
-                content = response.get('choices', [{}])[0].get('message', {}).get('content', '')
-            else:
-                content = ''
+                self.saved += 1
+        if not owner:
+            return future.result()
+
+        try:
+            content = call()
+        except BaseException as e:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self.in_flight.pop(key, None)
+            if content and self.max_answers:
+                self.answers[key] = content
+                if len(self.answers) > self.max_answers:
+                    self.answers.popitem(last=False)
+        future.set_result(content)
+        return content
+
+    def summary(self):
+        return f"Deduplication: {self.saved} duplicate rows answered without a call"
+
+
+# Run progress
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class RunProgress:
+    """
+    One progress bar for the whole run rather than one per batch. Next to
+    tqdm's rows/sec and ETA it shows requests in flight, retries, time spent
+    waiting on the rate limiter (budget and backoff), cache hit rate, error
+    rate, cost so far and the projected finish time,
+    refreshed every few seconds from a background thread. With log_path the
+    same stats are appended as one key=value line every log_interval seconds,
+    so a headless run can be followed with tail -f.
+    """
+
+    def __init__(self, total=None, initial=0, log_path=None, log_interval=60, refresh=2.0):
+        self.total = total
+        self.initial = initial     # rows already written by an earlier run (--resume)
+        self.done = initial
+        self.in_flight = 0
+        self.empty = 0             # rows finished with no output
+        self.log_path = log_path
+        self.log_interval = log_interval
+        self.refresh = refresh
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+        self.bar = tqdm(total=total, initial=initial, unit="row", dynamic_ncols=True)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="run-progress", daemon=True)
+        self.thread.start()
+
+    def start_row(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def finish_row(self, output, sent=True):
+        """Counts one finished row; sent=False for rows that never made a call of their own."""
+        with self.lock:
+            if sent:
+                self.in_flight -= 1
+            self.done += 1
+            self.empty += not output
+            self.bar.update(1)
+
+    def write(self, message):
+        """Prints a message above the bar instead of through it."""
+        tqdm.write(message)
+
+    def stats(self):
+        """Current run-level numbers as a dict."""
+        with self.lock:
+            done, in_flight, empty = self.done, self.in_flight, self.empty
+        elapsed = time.monotonic() - self.started
+        rate = (done - self.initial) / elapsed if elapsed > 0 else 0.0
+        calls = Metrics.totals()
+        limiters = RateLimiter.all_limiters()
+
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = max(self.total - done, 0) / rate
+        return {
+            "rows": done,
+            "total": self.total,
+            "rows_per_sec": rate,
+            "in_flight": in_flight,
+            "empty_rows": empty,
+            "calls": calls["calls"],
+            "cache_hit_rate": calls["cached"] / calls["calls"] if calls["calls"] else 0.0,
+            "error_rate": calls["errors"] / calls["calls"] if calls["calls"] else 0.0,
+            "retries": calls["retries"],
+            "throttled": sum(limiter.stats["throttled"] for limiter in limiters),
+            "wait_seconds": sum(limiter.stats["wait_seconds"] + limiter.stats["backoff_seconds"] for limiter in limiters),
+            "cost": calls["cost"],
+            "elapsed": elapsed,
+            "eta_seconds": eta,
+        }
 
-        results.append({
-            'input': prompt,
-            'output': content
-        })
+    def postfix(self, stats):
+        text = (f"{stats['in_flight']} in flight, cache {stats['cache_hit_rate']:.0%}, "
+                f"errors {stats['error_rate']:.1%}, {stats['retries']} retries, "
+                f"waiting {stats['wait_seconds']:.0f}s ({stats['throttled']} x 429), ${stats['cost']:.2f}")
+        if stats["eta_seconds"] is not None:
+            text += f", done ~{time.strftime('%H:%M', time.localtime(time.time() + stats['eta_seconds']))}"
+        return text
+
+    def line(self, stats=None):
+        """One key=value stats line, as written to the log."""
+        stats = stats or self.stats()
+        total = stats["total"] if stats["total"] is not None else "?"
+        line = (f"{time.strftime('%Y-%m-%dT%H:%M:%S')} rows={stats['rows']}/{total} "
+                f"rate={stats['rows_per_sec']:.2f}/s in_flight={stats['in_flight']} "
+                f"elapsed={_duration(stats['elapsed'])}")
+        if stats["eta_seconds"] is not None:
+            finish = time.strftime('%Y-%m-%dT%H:%M', time.localtime(time.time() + stats["eta_seconds"]))
+            line += f" eta={_duration(stats['eta_seconds'])} finish={finish}"
+        return line + (f" calls={stats['calls']} cache_hit={stats['cache_hit_rate']:.1%} "
+                       f"errors={stats['error_rate']:.1%} retries={stats['retries']} empty_rows={stats['empty_rows']} "
+                       f"throttled={stats['throttled']} limiter_wait={stats['wait_seconds']:.1f}s "
+                       f"cost=${stats['cost']:.4f}")
+
+    def _log(self, stats):
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as file:
+                file.write(self.line(stats) + "\n")
+        except OSError as e:
+            tqdm.write(f"Could not write progress log: {e}")
+
+    def _run(self):
+        next_log = time.monotonic() + self.log_interval
+        while not self.stopped.wait(min(self.refresh, self.log_interval)):
+            stats = self.stats()
+            self.bar.set_postfix_str(self.postfix(stats), refresh=False)
+            # redraw here too: the bar otherwise only redraws when a row
+            # finishes, so stats froze while every worker was waiting
+            self.bar.refresh()
+            if self.log_path and time.monotonic() >= next_log:
+                self._log(stats)
+                next_log += self.log_interval
+
+    def close(self):
+        """Stops the refresh thread and the bar; returns the final stats line (also logged)."""
+        self.stopped.set()
+        self.thread.join()
+        stats = self.stats()
+        self.bar.set_postfix_str(self.postfix(stats), refresh=False)
+        self.bar.close()
+        if self.log_path:
+            self._log(stats)
+        return self.line(stats)
+
+
+# Output writer
+
+OUTPUT_FORMATS = ("csv", "jsonl", "parquet")
+
+
+def output_format_for(output_file):
+    """Output format implied by the file extension; csv unless .jsonl or .parquet."""
+    extension = os.path.splitext(output_file)[1].lower().lstrip('.')
+    return extension if extension in ("jsonl", "parquet") else "csv"
+
+
+class OutputWriter:
+    """
+    Appends finished rows to the output from one dedicated thread, fed by a
+    queue. Rows may finish in any order; they are written in input order,
+    flushed straight away (fsynced every fsync_interval seconds if set) and
+    only then marked written in the checkpoint journal. A row whose call
+    failed (empty output) is left out of the output and journaled as failed,
+    so --resume appends it once it succeeds; no input row appears twice.
+
+    csv and jsonl append to a single file. parquet cannot be appended to, so
+    the output is a directory and every parquet_rows rows become a new part
+    file, read back as one table with pd.read_parquet(output_file).
+    """
 
-    # Write to CSV without overwriting
     fields = ['input', 'output']
-    write_header = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
-
-    with open(output_file, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        if write_header:
-            writer.writeheader()
-        writer.writerows(results)
-
-    return len(results)
 
+    def __init__(self, output_file, output_format=None, checkpoint=None, fsync_interval=None, parquet_rows=1000):
+        self.path = output_file
+        self.format = output_format or output_format_for(output_file)
+        self.checkpoint = checkpoint
+        self.fsync_interval = fsync_interval
+        self.parquet_rows = parquet_rows
+
+        self.queue = queue.Queue()
+        self.expected = collections.deque()  # row indices in input order, not yet written
+        self.pending = {}                    # row index -> row, finished ahead of its turn
+        self.buffer = []                     # parquet rows not yet in a part file
+        self.buffered = []
+        self.error = None
+        self.last_sync = time.monotonic()
+
+        self.file = None
+        self.csv_writer = None
+        if self.format == "parquet":
+            os.makedirs(self.path, exist_ok=True)
+            self.part = len([name for name in os.listdir(self.path) if name.endswith('.parquet')])
+        else:
+            write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self.file = open(self.path, 'a', newline='', encoding='utf-8')
+            if self.format == "csv":
+                self.csv_writer = csv.DictWriter(self.file, fieldnames=self.fields)
+                if write_header:
+                    self.csv_writer.writeheader()
+
+        self.thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self.thread.start()
+
+    def expect(self, indices):
+        """Announces the next rows in input order; each must later be put()."""
+        self._put(('expect', list(indices)))
+
+    def put(self, index, prompt, output):
+        """Hands over one finished row; safe to call from any thread."""
+        self._put(('row', index, {'input': prompt, 'output': output}))
+
+    def _put(self, item):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(item)
+
+    def close(self):
+        """Writes whatever is in order, then stops the thread. Rows still waiting
+        on an earlier row stay in the journal for --resume."""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                # take everything already queued, so one flush covers many rows
+                items = [self.queue.get()]
+                while True:
+                    try:
+                        items.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                for item in items:
+                    if item is None:
+                        stopping = True
+                    elif item[0] == 'expect':
+                        self.expected.extend(item[1])
+                    else:
+                        self.pending[item[1]] = item[2]
+                self._drain()
+
+            if self.buffer:
+                self._write_part()
+        except Exception as e:
+            self.error = e
+        finally:
+            if self.file is not None:
+                self.file.close()
+
+    def _drain(self):
+        written = []
+        skipped = []
+        while self.expected and self.expected[0] in self.pending:
+            index = self.expected.popleft()
+            row = self.pending.pop(index)
+            if not row['output']:
+                skipped.append(index)
+            elif self.format == "parquet":
+                self.buffer.append(row)
+                self.buffered.append(index)
+            elif self.format == "jsonl":
+                self.file.write(json.dumps(row) + "\n")
+                written.append(index)
+            else:
+                self.csv_writer.writerow(row)
+                written.append(index)
+
+        if self.format == "parquet":
+            if len(self.buffer) >= self.parquet_rows:
+                self._write_part()
+        elif written:
+            self.file.flush()
+            if self.fsync_interval is not None and time.monotonic() - self.last_sync >= self.fsync_interval:
+                os.fsync(self.file.fileno())
+                self.last_sync = time.monotonic()
+            self._mark_written(written)
+        if skipped:
+            self._mark_written(skipped)
+
+    def _write_part(self):
+        # written under a dot-name and renamed, so readers never see half a file
+        name = f"part-{self.part:05d}.parquet"
+        temp_path = os.path.join(self.path, "." + name + ".tmp")
+        pd.DataFrame(self.buffer, columns=self.fields).to_parquet(temp_path, index=False)
+        os.replace(temp_path, os.path.join(self.path, name))
+        self.part += 1
+        self._mark_written(self.buffered)
+        self.buffer = []
+        self.buffered = []
+
+    def _mark_written(self, indices):
+        if self.checkpoint is not None:
+            self.checkpoint.mark_written(indices)
+
+
+# Checkpoint journal
+
+class Checkpoint:
+    """
+    Append-only journal kept next to the output file. Every finished row is
+    logged with its output the moment it completes, and rows appended to the
+    output are marked as written, so --resume neither re-sends finished rows
+    nor duplicates rows already in the output.
+
+    A row whose call failed (empty output) is not journaled as finished and
+    is kept out of the output; once the writer reaches it, it is logged as
+    failed rather than written, so --resume sends it again and appends the
+    new answer after the rows already in the output.
+    """
+
+    def __init__(self, output_file, resume=False):
+        self.path = output_file + ".journal"
+        self.done = {}        # row index -> output, finished but not yet in the CSV
+        self.written = set()  # row indices already appended to the CSV
+        self.failed = set()   # rows of this run that ended with no output
+        self.batches = {}     # (first row, last row) of a submit chunk -> (batch id, aliases)
+        self.lock = threading.Lock()
+
+        if resume and os.path.exists(self.path):
+            self._load()
+        self.file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                if 'batch' in entry:
+                    aliases = {int(row): source for row, source in entry.get('aliases', {}).items()}
+                    self.batches[tuple(entry['chunk'])] = (entry['batch'], aliases)
+                elif 'merged' in entry:
+                    # results already taken; rows that failed in it go in a new job
+                    self.batches.pop(tuple(entry['merged']), None)
+                elif 'written' in entry:
+                    # 'failed' rows are not in the output; leaving them out
+                    # of written makes --resume send them again
+                    for row in entry['written']:
+                        self.written.add(row)
+                        self.done.pop(row, None)
+                else:
+                    self.done[entry['row']] = entry['output']
+
+    def _append(self, entry):
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+
+    def record(self, row, output):
+        """Logs one finished row; a failed (empty) one is only remembered as failed."""
+        if not output:
+            with self.lock:
+                self.failed.add(row)
+            return
+        self._append({'row': row, 'output': output})
+
+    def record_batch(self, batch_id, chunk, aliases):
+        """Logs a submitted provider batch job, so --resume polls it instead of paying for it twice."""
+        self._append({'batch': batch_id, 'chunk': list(chunk), 'aliases': aliases})
+
+    def mark_merged(self, chunk):
+        """Logs that a batch job's results have all been handed to the writer."""
+        self._append({'merged': list(chunk)})
+
+    def mark_written(self, rows):
+        """Logs that these rows are now in the output CSV (failed ones as failed, not written)."""
+        with self.lock:
+            failed = [row for row in rows if row in self.failed]
+        rows = [row for row in rows if row not in self.failed]
+        entry = {'written': rows}
+        if failed:
+            entry['failed'] = failed
+        self._append(entry)
+        self.written.update(rows)
+        for row in rows:
+            self.done.pop(row, None)
+
+    def close(self):
+        self.file.close()
+
+
+class RowWindow:
+    """
+    Runs rows on a worker pool with at most size of them submitted and not yet
+    finished. Batches feed it one after another without waiting for each
+    other, so workers never sit idle on a batch's slowest row; the writer
+    puts rows back in input order. A row that raised is re-raised by the next
+    submit() or by wait().
+    """
+
+    def __init__(self, executor, size):
+        self.executor = executor
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.futures = set()
+        self.error = None
+
+    def submit(self, fn, *args):
+        self.slots.acquire()
+        if self.error is not None:
+            self.slots.release()
+            raise self.error
+        future = self.executor.submit(fn, *args)
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self.lock:
+            self.futures.discard(future)
+            if not future.cancelled() and future.exception() is not None and self.error is None:
+                self.error = future.exception()
+        self.slots.release()
+
+    def wait(self):
+        """Blocks until every submitted row has finished."""
+        with self.lock:
+            futures = list(self.futures)
+        for future in futures:
+            if not future.cancelled():
+                future.exception()
+        if self.error is not None:
+            raise self.error
+
+
+def batch_processing(provider, df_batch, writer, other_notes, window=None, checkpoint=None, dedup=None,
+                     schema=None, json_retries=1, progress=None):
+    # with a RowWindow the rows are handed to the worker pool and this returns
+    # without waiting for them; each row goes to the writer thread as soon as
+    # it finishes and the writer puts them back in input order
+    rows = [(int(index), row.get('text', '')) for index, row in df_batch.iterrows()]  # adjust column name as needed
+    if checkpoint is not None:
+        rows = [(index, prompt) for index, prompt in rows if index not in checkpoint.written]
+    if not rows:
+        return 0
+
+    writer.expect(index for index, _ in rows)
+
+    def run(item):
+        index, prompt = item
+        if checkpoint is not None and index in checkpoint.done:
+            content = checkpoint.done[index]
+            if progress is not None:
+                progress.finish_row(content, sent=False)
+            writer.put(index, prompt, content)
+            return
+
+        if progress is not None:
+            progress.start_row()
+        if dedup is not None:
+            content = dedup.run(request_key(provider, prompt, other_notes),
+                                lambda: process_row(provider, prompt, other_notes, schema, json_retries))
+            if checkpoint is not None:
+                checkpoint.record(index, content)
+        else:
+            content = process_row(provider, prompt, other_notes, schema, json_retries)
+            if checkpoint is not None:
+                checkpoint.record(index, content)
+        if progress is not None:
+            progress.finish_row(content)
+        writer.put(index, prompt, content)
+
+    for item in rows:
+        if window is None:
+            run(item)
+        else:
+            window.submit(run, item)
+
+    return len(rows)
+
+
+# Provider batch mode
+
+def pending_rows(df_batch, checkpoint):
+    """(row index, text) for the rows of df_batch not yet in the output."""
+    rows = [(int(index), row.get('text', '')) for index, row in df_batch.iterrows()]  # adjust column name as needed
+    return [(index, prompt) for index, prompt in rows if index not in checkpoint.written]
+
+
+def message_batch_processing(provider, args, checkpoint, writer, dedup=None, schema=None, progress=None):
+    """
+    Submits the row range as provider batch jobs, waits for them to finish and
+    hands the results to the output writer in input order. With dedup, rows
+    repeating a request already in the same job are not submitted again.
+    Submitted jobs are journaled; on --resume a chunk whose job was already
+    submitted is polled rather than submitted again.
+    """
+    client = MessageBatches.get_client(provider.name, provider.api_key, args.base_url)
+    say = progress.write if progress is not None else print
+
+    # submit every job first so the provider works on all of them at once;
+    # only batch ids are kept, the rows are streamed again when merging
+    batch_ids = []
+    aliases = {}    # duplicate row index -> row index whose request answers it
+    for chunk in load_csv_batches(args.input, args.submit_size, args.start_row, args.end_row):
+        rows = [(index, prompt) for index, prompt in pending_rows(chunk, checkpoint) if index not in checkpoint.done]
+        if not rows:
+            batch_ids.append(None)
+            continue
+
+        span = (int(chunk.index[0]), int(chunk.index[-1]))
+        if span in checkpoint.batches:
+            batch_id, chunk_aliases = checkpoint.batches[span]
+            aliases.update(chunk_aliases)
+            if dedup is not None:
+                dedup.saved += len(chunk_aliases)
+            batch_ids.append(batch_id)
+            say(f"Resuming batch {batch_id}: rows {span[0]} to {span[1]}")
+            continue
+
+        requests_ = []
+        first_row = {}
+        chunk_aliases = {}
+        for index, prompt in rows:
+            if dedup is not None:
+                key = request_key(provider, prompt, args.other_notes)
+                if key in first_row:
+                    chunk_aliases[index] = first_row[key]
+                    dedup.saved += 1
+                    continue
+                first_row[key] = index
+            system, user_prompt = create_prompt(prompt, other_notes=args.other_notes, schema=schema)
+            requests_.append((f"row-{index}", provider.build_payload(user_prompt, system)))
+        batch_id = client.submit(requests_)
+        checkpoint.record_batch(batch_id, span, chunk_aliases)
+        aliases.update(chunk_aliases)
+        batch_ids.append(batch_id)
+        say(f"Submitted batch {batch_id}: rows {rows[0][0]} to {rows[-1][0]} ({len(requests_)} requests)")
 
+    total_processed = 0
+    chunks = load_csv_batches(args.input, args.submit_size, args.start_row, args.end_row)
+    for chunk, batch_id in zip(chunks, batch_ids):
+        rows = pending_rows(chunk, checkpoint)
+        if not rows:
+            continue
+
+        responses = {}
+        if batch_id is not None:
+            say(f"Waiting for batch {batch_id}...")
+            MessageBatches.wait(client, batch_id, args.poll_interval)
+            responses = client.results(batch_id)
+
+        writer.expect(index for index, _ in rows)
+        for index, prompt in rows:
+            if index in checkpoint.done:
+                content = checkpoint.done[index]
+            else:
+                source = aliases.pop(index, index)
+                if source == index:
+                    provider.record_usage(responses.get(f"row-{index}"))
+                content = provider.extract_text(responses.get(f"row-{source}")) or ''
+                if schema is not None:
+                    # no re-asks in batch mode; a reply that cannot be repaired stays raw
+                    content = structured_output(content, schema) or content
+                checkpoint.record(index, content)
+            if progress is not None:
+                progress.finish_row(content, sent=False)
+            writer.put(index, prompt, content)
+        if batch_id is not None:
+            checkpoint.mark_merged((int(chunk.index[0]), int(chunk.index[-1])))
+        total_processed += len(rows)
+
+    return total_processed
 
 
 # Terminal command examples:
@@ -166,6 +769,45 @@ def batch_processing(api_key, df_batch, output_file, llm_model, other_notes):
 # With optional parameters:
 # python3 script.py --input data.csv --output results.csv --LLM_model Claude --batch_size 25 --start_row 0 --end_row 100 --other_notes "additional instructions"
 #
+# Sending 8 rows at a time:
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --concurrency 8
+#
+# Staying under the account's rate limit (429s are retried with backoff either way):
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --concurrency 8 --requests_per_min 50 --tokens_per_min 40000
+#
+# Re-running after small edits reuses cached answers; skip or rebuild the cache with:
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --no-cache
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --refresh-cache
+#
+# Offline provider batch jobs (cheaper, results within 24h; --base_url points at a stand-in server):
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --mode batch --poll_interval 60
+#
+# Picking up where a crashed or interrupted run stopped (same --output):
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --resume
+#
+# Per-call latency, tokens and cost as JSON lines (a summary is printed either way):
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --metrics_out metrics.jsonl
+#
+# Writing JSON lines or a Parquet directory instead of CSV, fsyncing every 5 seconds:
+# python3 script.py --input data.csv --output results.jsonl --LLM_model Claude --fsync_interval 5
+# python3 script.py --input data.csv --output results.parquet --LLM_model Claude --output_format parquet
+#
+# Repeated texts are sent once and the answer reused; to send every row anyway:
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --no-dedup
+#
+# Spreading rows over several API keys/models (throttled keys fail over to the others):
+# python3 script.py --input data.csv --output results.csv --routes routes.json --routing least_loaded --concurrency 32
+# routes.json:
+# [{"provider": "Claude", "api_key_env": "ANTHROPIC_API_KEY", "weight": 2, "requests_per_min": 50},
+#  {"provider": "Claude", "api_key_env": "ANTHROPIC_API_KEY_2", "requests_per_min": 50},
+#  {"provider": "DeepSeek", "model": "deepseek-chat"}]
+#
+# JSON replies checked against a schema (malformed ones are repaired locally before any re-ask):
+# python3 script.py --input data.csv --output results.jsonl --LLM_model Claude --json_schema schema.json --json_retries 1
+#
+# One progress bar for the whole run; headless runs can follow the stats line written to a log every 30 seconds:
+# python3 script.py --input data.csv --output results.csv --LLM_model Claude --concurrency 16 --progress_log progress.log --progress_interval 30
+#
 # Using environment variables for API key:
 # export ANTHROPIC_API_KEY=your_key   (for Claude)
 # export DEEPSEEK_API_KEY=your_key    (for DeepSeek)
@@ -179,40 +821,186 @@ def main():
     parser.add_argument("--start_row", type=int, default=0, help='start row')
     parser.add_argument("--end_row", type=int, default=None, help='end row, row indexing provided')     
     parser.add_argument("--api_key", type=str, help='API key in env')
-    parser.add_argument("--LLM_model", type=str, help='choose between DeepSeek and Claude')
+    parser.add_argument("--LLM_model", type=str, default="DeepSeek", help=f"provider to use: {', '.join(Providers.PROVIDERS)}")
+    parser.add_argument("--model", type=str, default=None, help='model name (default: the provider default)')
     parser.add_argument("--other_notes", type=str, default="", help='additional notes for prompt')
+    parser.add_argument("--concurrency", type=int, default=1, help='num requests in flight at once')
+    parser.add_argument("--requests_per_min", type=int, default=None, help='client-side request budget for the provider')
+    parser.add_argument("--tokens_per_min", type=int, default=None, help='client-side token budget for the provider')
+    parser.add_argument("--max_retries", type=int, default=5, help='retries for 429/5xx responses before a row is left out (retried by --resume)')
+    parser.add_argument("--pool_size", type=int, default=None, help='keep-alive connections per provider (default: concurrency)')
+    parser.add_argument("--no_cache", "--no-cache", action="store_true", help='do not read or write the response cache')
+    parser.add_argument("--refresh_cache", "--refresh-cache", action="store_true", help='ignore cached responses but store the new ones')
+    parser.add_argument("--cache_path", type=str, default=ResponseCache.DEFAULT_PATH, help='SQLite response cache file')
+    parser.add_argument("--resume", action="store_true", help='skip rows the output journal marks as done')
+    parser.add_argument("--mode", type=str, default="sync", choices=["sync", "batch"], help='sync requests or provider batch jobs')
+    parser.add_argument("--submit_size", type=int, default=10000, help='rows per provider batch job (batch mode)')
+    parser.add_argument("--poll_interval", type=float, default=30, help='seconds between batch status checks (batch mode)')
+    parser.add_argument("--base_url", type=str, default=None, help='provider API root, e.g. a local stand-in server')
+    parser.add_argument("--timeout", type=float, default=HttpPool.DEFAULT_READ_TIMEOUT, help='seconds to wait for a response')
+    parser.add_argument("--output_format", type=str, default=None, choices=OUTPUT_FORMATS, help='csv, jsonl or parquet (default: from the --output extension)')
+    parser.add_argument("--fsync_interval", type=float, default=None, help='seconds between fsyncs of the output (default: flush only)')
+    parser.add_argument("--routes", type=str, default=None, help='JSON file of API keys/models to spread rows across (overrides --LLM_model/--api_key)')
+    parser.add_argument("--routing", type=str, default=Router.ROUND_ROBIN, choices=Router.STRATEGIES, help='how --routes shares rows: weighted round-robin or least loaded')
+    parser.add_argument("--json_schema", type=str, default=None, help='JSON Schema file; replies are requested, repaired and stored as JSON matching it')
+    parser.add_argument("--json_retries", type=int, default=1, help='re-asks for a reply that still fails the schema after local repair')
+    parser.add_argument("--no_dedup", "--no-dedup", action="store_true", help='send every row even when its text repeats an earlier row')
+    parser.add_argument("--metrics_out", type=str, default=None, help='append per-call metrics to this JSON lines file')
+    parser.add_argument("--progress_log", type=str, default=None, help='append a run stats line (rows/sec, ETA, errors, cost...) to this file periodically')
+    parser.add_argument("--progress_interval", type=float, default=60, help='seconds between --progress_log lines')
 
     args = parser.parse_args()
 
-    api_key = args.api_key or os.getenv('ANTHROPIC_API_KEY') or os.getenv('DEEPSEEK_API_KEY')
-
-    if not api_key:
-        print("API key not found")
-        return
-
-    df = load_csv(args.input)
-
-    if df is None:
+    router = None
+    if args.routes:
+        # several keys/models, each with its own limiter and pool
+        try:
+            router = Router.build_router(
+                Router.load_routes(args.routes),
+                strategy=args.routing,
+                max_retries=args.max_retries,
+                pool_size=args.pool_size or max(args.concurrency, 1),
+                read_timeout=args.timeout,
+                default_base_url=args.base_url,
+            )
+        except KeyError as e:
+            print(e.args[0])
+            return
+        except (OSError, ValueError) as e:
+            print(f"Could not load routes: {e}")
+            return
+
+        provider = router.routes[0].provider
+        print(f"Routing rows across {len(router.routes)} routes ({args.routing})")
+        if args.mode == "batch":
+            print(f"Batch mode submits through the first route only ({provider.route})")
+    else:
+        try:
+            provider_class = Providers.get_provider_class(args.LLM_model)
+        except KeyError as e:
+            print(e.args[0])
+            return
+
+        api_key = args.api_key or os.getenv(provider_class.api_key_env)
+
+        if not api_key:
+            print("API key not found")
+            return
+
+        provider = provider_class(api_key, model=args.model, base_url=args.base_url)
+        limiter = RateLimiter.configure(
+            provider.name,
+            requests_per_min=args.requests_per_min,
+            tokens_per_min=args.tokens_per_min,
+            max_retries=args.max_retries,
+        )
+        HttpPool.configure(
+            provider.name,
+            pool_size=args.pool_size or max(args.concurrency, 1),
+            read_timeout=args.timeout,
+        )
+
+    if args.mode == "batch":
+        try:
+            MessageBatches.check_supported(provider.name, args.base_url)
+        except ValueError as e:
+            print(e)
+            return
+
+    schema = None
+    if args.json_schema:
+        try:
+            with open(args.json_schema, 'r', encoding='utf-8') as f:
+                schema = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load JSON schema: {e}")
+            return
+
+    # also the progress total; None if the file cannot be read
+    total_rows = count_rows(args.input, args.start_row, args.end_row)
+    if total_rows is None:
         print("Failed to load CSV")
         return
 
-    start_row = args.start_row
-    end_row = args.end_row if args.end_row is not None else len(df)
-    df_to_process = df.iloc[start_row:end_row].copy()
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache.enable(path=args.cache_path, refresh=args.refresh_cache)
 
-    print(f"Processing rows {start_row} to {end_row - 1} ({len(df_to_process)} rows total)")
+    start_row = args.start_row
+    if args.end_row is not None:
+        print(f"Processing rows {start_row} to {args.end_row - 1} ({max(args.end_row - start_row, 0)} rows total)")
+    else:
+        print(f"Processing rows {start_row} to end of file")
+
+    checkpoint = Checkpoint(args.output, resume=args.resume)
+    if args.resume:
+        print(f"Resuming: {len(checkpoint.written)} rows already written, "
+              f"{len(checkpoint.done)} finished rows recovered from {checkpoint.path}")
+
+    output_format = args.output_format or output_format_for(args.output)
+    if output_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401 - pandas needs it for to_parquet
+        except ImportError:
+            print("Parquet output needs pyarrow (pip install pyarrow)")
+            checkpoint.close()
+            return
+    writer = OutputWriter(args.output, output_format, checkpoint, args.fsync_interval)
+    dedup = None if args.no_dedup else Deduplicator()
+
+    # Worker pool shared by every batch, so threads and connections are reused;
+    # twice as many rows as workers are queued so a freed worker never waits
+    executor = ThreadPoolExecutor(max_workers=args.concurrency) if args.concurrency > 1 else None
+    window = RowWindow(executor, args.concurrency * 2) if executor is not None else None
+
+    end_row = args.end_row
+    already_written = sum(1 for index in checkpoint.written if index >= start_row and (end_row is None or index < end_row))
+    progress = RunProgress(total_rows, already_written,
+                           args.progress_log, args.progress_interval)
+
+    if args.metrics_out:
+        Metrics.open_jsonl(args.metrics_out)
 
     # Process in batches
     total_processed = 0
-    for i in range(0, len(df_to_process), args.batch_size):
-        batch_end = min(i + args.batch_size, len(df_to_process))
-        batch = df_to_process.iloc[i:batch_end]
-
-        print(f"Processing batch: rows {i + start_row} to {batch_end + start_row - 1}")
-        processed = batch_processing(api_key, batch, args.output, args.LLM_model, args.other_notes)
-        total_processed += processed
+    try:
+        if args.mode == "batch":
+            total_processed = message_batch_processing(provider, args, checkpoint, writer, dedup, schema, progress)
+        else:
+            # opened here, not up front: the reader holds the file open until consumed
+            for batch in load_csv_batches(args.input, args.batch_size, start_row, end_row):
+                processed = batch_processing(router or provider, batch, writer, args.other_notes, window, checkpoint, dedup,
+                                             schema, args.json_retries, progress)
+                total_processed += processed
+            if window is not None:
+                window.wait()
+    finally:
+        if executor is not None:
+            # let in-flight rows finish and reach the journal, drop queued ones
+            executor.shutdown(wait=True, cancel_futures=True)
+        run_stats = progress.close()
+        writer.close()
+        checkpoint.close()
+        HttpPool.close_all()
+        Metrics.close_jsonl()
 
     print(f"Done. Total processed: {total_processed}")
+    if checkpoint.failed:
+        print(f"{len(checkpoint.failed)} rows got no output and were left out of {args.output}; "
+              f"run again with --resume to retry them")
+    print(f"Run: {run_stats}")
+    print(router.summary() if router else limiter.summary())
+    if dedup is not None:
+        print(dedup.summary())
+    if schema is not None:
+        print(StructuredOutput.summary())
+    if Metrics.summary():
+        print(Metrics.summary())
+    if args.metrics_out:
+        print(f"Per-call metrics written to {args.metrics_out}")
+    if cache is not None:
+        print(cache.summary())
+        cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,409 @@
+# Local stand-in for the Anthropic (/v1/messages) and DeepSeek
+# (/v1/chat/completions) APIs, streaming included, plus their batch endpoints,
+# so the connectors can be developed and benchmarked without spending money on
+# live APIs. Latency, error rate and 429 bursts are configurable.
+#
+# python3 benchmarks/mock_llm_server.py --port 8765 --batch_delay 5
+# python3 Carlson_scripts/LLMs_Console.py --input data.csv --output out.csv --LLM_model Claude \
+#     --api_key test --mode batch --base_url http://127.0.0.1:8765 --poll_interval 1
+#
+# python3 benchmarks/mock_llm_server.py --port 8765 --latency 0.8 --latency_spread 0.5 --error_rate 0.02 \
+#     --burst_every 30 --burst_length 3
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+_ASKED = re.compile(r"^Q(\d+): \[answer\]", re.MULTILINE)
+_NUMBERED = re.compile(r"^\s*(?:Q(?:uestion)?\s*)?(\d{1,3})\s*[.):]\s+\S", re.MULTILINE | re.IGNORECASE)
+
+
+def fake_reply(prompt, json_answers=False):
+    """
+    Deterministic answer text for a prompt. Validator prompts get replies in
+    the shape it parses: Q1:/Q2: answers (or a JSON answer set when the
+    system prompt asks for JSON) for question prompts and "true" verdicts for
+    comparison prompts, so both models always agree. Other prompts get an
+    echo, as {"reply": ...} in JSON mode.
+    """
+    if "Compare these two answer sets" in prompt:
+        if "question by question" in prompt:
+            numbers = sorted(set(int(number) for number in re.findall(r"^Q(\d+):", prompt, re.MULTILINE)))
+            return "\n".join(f"Q{number}: true" for number in numbers)
+        return "true"
+
+    numbers = [int(number) for number in _ASKED.findall(prompt)]
+    if not numbers:
+        numbers = sorted(set(int(number) for number in _NUMBERED.findall(prompt)))
+    if numbers and json_answers:
+        return json.dumps({"answers": [{"question": number, "answer": f"mock answer {number}"} for number in numbers]})
+    if numbers:
+        return "\n".join(f"Q{number}: mock answer {number}" for number in numbers)
+    if json_answers:
+        return json.dumps({"reply": f"mock reply to {len(prompt)} chars"})
+    return f"mock reply to {len(prompt)} chars: {prompt.strip()[-40:]}"
+
+
+def _user_prompt(payload):
+    return payload["messages"][-1]["content"]
+
+
+def _system_text(payload):
+    system = payload.get("system") or [m for m in payload["messages"] if m.get("role") == "system"]
+    if isinstance(system, str):
+        return system
+    return "".join(block.get("text") or block.get("content") or "" for block in system)
+
+
+def _system_length(payload):
+    """Characters of system prompt, which the mock reports as cache reads."""
+    return len(_system_text(payload))
+
+
+def _reply_for(payload):
+    return fake_reply(_user_prompt(payload), json_answers="JSON Schema" in _system_text(payload))
+
+
+def claude_message(payload):
+    prompt = _user_prompt(payload)
+    text = _reply_for(payload)
+    return {
+        "id": "msg_" + uuid.uuid4().hex[:24],
+        "type": "message",
+        "role": "assistant",
+        "model": payload.get("model"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": len(prompt) // 4, "cache_read_input_tokens": _system_length(payload) // 4,
+                  "output_tokens": len(text) // 4}
+    }
+
+
+def deepseek_completion(payload):
+    prompt = _user_prompt(payload)
+    text = _reply_for(payload)
+    return {
+        "id": uuid.uuid4().hex,
+        "object": "chat.completion",
+        "model": payload.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": (len(prompt) + _system_length(payload)) // 4,
+                  "prompt_cache_hit_tokens": _system_length(payload) // 4,
+                  "prompt_cache_miss_tokens": len(prompt) // 4,
+                  "completion_tokens": len(text) // 4}
+    }
+
+
+def claude_stream_events(message):
+    """Server-sent events carrying message the way /v1/messages streams it."""
+    usage = message["usage"]
+    yield {"type": "message_start", "message": {**message, "content": [],
+                                                "usage": {**usage, "output_tokens": 1}}}
+    yield {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+    text = message["content"][0]["text"]
+    for start in range(0, len(text), 40):
+        yield {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text[start:start + 40]}}
+    yield {"type": "content_block_stop", "index": 0}
+    yield {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": usage["output_tokens"]}}
+    yield {"type": "message_stop"}
+
+
+def deepseek_stream_events(completion):
+    """Server-sent events carrying completion the way /v1/chat/completions streams it."""
+    text = completion["choices"][0]["message"]["content"]
+    for start in range(0, len(text), 40):
+        yield {"id": completion["id"], "object": "chat.completion.chunk",
+               "choices": [{"index": 0, "delta": {"content": text[start:start + 40]}, "finish_reason": None}]}
+    yield {"id": completion["id"], "object": "chat.completion.chunk", "choices": [], "usage": completion["usage"]}
+
+
+class MockState:
+    """Everything the server remembers between requests, and its failure settings."""
+
+    def __init__(self, batch_delay=2.0, latency=0.0, latency_spread=0.0, error_rate=0.0,
+                 burst_every=0.0, burst_length=0.0, seed=None):
+        self.batch_delay = batch_delay
+        self.latency = latency                # median seconds before a reply starts
+        self.latency_spread = latency_spread  # sigma of the lognormal around it; 0 = fixed
+        self.error_rate = error_rate          # share of calls answered with a 500
+        self.burst_every = burst_every        # seconds between 429 bursts; 0 = none
+        self.burst_length = burst_length      # seconds each burst lasts
+        self.random = random.Random(seed)
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.batches = {}   # batch id -> {"created", "kind", "requests"}
+        self.files = {}     # file id -> bytes
+        self.stats = {"calls": 0, "throttled": 0, "errors": 0}
+
+    def batch_done(self, batch):
+        return time.time() - batch["created"] >= self.batch_delay
+
+    def draw_latency(self):
+        with self.lock:
+            if self.latency <= 0:
+                return 0.0
+            if self.latency_spread <= 0:
+                return self.latency
+            return self.latency * self.random.lognormvariate(0, self.latency_spread)
+
+    def draw_failure(self):
+        """Returns (status, retry-after seconds) for a call that should fail, or None."""
+        with self.lock:
+            self.stats["calls"] += 1
+            if self.burst_every > 0:
+                into_cycle = (time.time() - self.started) % self.burst_every
+                if into_cycle >= self.burst_every - self.burst_length:
+                    self.stats["throttled"] += 1
+                    return 429, self.burst_every - into_cycle
+            if self.error_rate > 0 and self.random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 500, None
+        return None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = "HTTP/1.1"   # keep-alive, so client connection pooling is exercised
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_events(self, events, done_marker=False, first_token_delay=0.0):
+        """
+        Streams events as server-sent events (closing the connection ends the
+        body). Headers go out at once and the first event after
+        first_token_delay, as with the real APIs; a client that hangs up
+        early (a cancelled stream) just ends the reply.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self.wfile.flush()
+            time.sleep(first_token_delay)
+            for event in events:
+                self.wfile.write(f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            if done_marker:
+                self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_failure(self, status, retry_after):
+        data = json.dumps({"type": "error", "error": {"type": "mock_error", "message": f"mock {status}"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if retry_after is not None:
+            self.send_header("retry-after", f"{max(retry_after, 0.0):.2f}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, text):
+        data = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/jsonl")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _get_batch(self, batch_id):
+        with self.state.lock:
+            return self.state.batches.get(batch_id)
+
+    # ---------- routing ----------
+
+    def do_POST(self):
+        if self.path == "/v1/messages":
+            return self._complete(claude_message, claude_stream_events, done_marker=False)
+        if self.path == "/v1/chat/completions":
+            return self._complete(deepseek_completion, deepseek_stream_events, done_marker=True)
+        if self.path == "/v1/messages/batches":
+            return self._create_claude_batch()
+        if self.path == "/v1/files":
+            return self._upload_file()
+        if self.path == "/v1/batches":
+            return self._create_openai_batch()
+        self._send_json({"error": {"message": f"unknown path {self.path}"}}, 404)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[:3] == ["v1", "messages", "batches"] and len(parts) == 4:
+            return self._claude_batch_status(parts[3])
+        if parts[:3] == ["v1", "messages", "batches"] and len(parts) == 5 and parts[4] == "results":
+            return self._claude_batch_results(parts[3])
+        if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+            return self._openai_batch_status(parts[2])
+        if parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content":
+            return self._file_content(parts[2])
+        self._send_json({"error": {"message": f"unknown path {self.path}"}}, 404)
+
+    # ---------- single calls ----------
+
+    def _complete(self, build, stream_events, done_marker):
+        payload = json.loads(self._read_body())
+        failure = self.state.draw_failure()
+        if failure is not None:
+            return self._send_failure(*failure)
+
+        reply = build(payload)
+        if payload.get("stream"):
+            return self._send_events(stream_events(reply), done_marker, self.state.draw_latency())
+        time.sleep(self.state.draw_latency())
+        self._send_json(reply)
+
+    # ---------- Anthropic Message Batches ----------
+
+    def _create_claude_batch(self):
+        body = json.loads(self._read_body())
+        batch_id = "msgbatch_" + uuid.uuid4().hex[:24]
+        with self.state.lock:
+            self.state.batches[batch_id] = {"created": time.time(), "kind": "claude", "requests": body["requests"]}
+        self._claude_batch_status(batch_id)
+
+    def _claude_batch_status(self, batch_id):
+        batch = self._get_batch(batch_id)
+        if batch is None:
+            return self._send_json({"error": {"message": "batch not found"}}, 404)
+        done = self.state.batch_done(batch)
+        host = self.headers.get("Host")
+        self._send_json({
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if done else "in_progress",
+            "request_counts": {"processing": 0 if done else len(batch["requests"]),
+                               "succeeded": len(batch["requests"]) if done else 0},
+            "results_url": f"http://{host}/v1/messages/batches/{batch_id}/results" if done else None
+        })
+
+    def _claude_batch_results(self, batch_id):
+        batch = self._get_batch(batch_id)
+        if batch is None or not self.state.batch_done(batch):
+            return self._send_json({"error": {"message": "results not ready"}}, 404)
+        lines = [
+            json.dumps({"custom_id": request["custom_id"],
+                        "result": {"type": "succeeded", "message": claude_message(request["params"])}})
+            for request in batch["requests"]
+        ]
+        self._send_text("\n".join(lines) + "\n")
+
+    # ---------- OpenAI-compatible files + batches ----------
+
+    def _upload_file(self):
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+        message = BytesParser(policy=policy.default).parsebytes(header + self._read_body())
+        content = b""
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                content = part.get_payload(decode=True)
+
+        file_id = "file-" + uuid.uuid4().hex[:24]
+        with self.state.lock:
+            self.state.files[file_id] = content
+        self._send_json({"id": file_id, "object": "file", "bytes": len(content), "purpose": "batch"})
+
+    def _create_openai_batch(self):
+        body = json.loads(self._read_body())
+        with self.state.lock:
+            content = self.state.files.get(body["input_file_id"])
+        if content is None:
+            return self._send_json({"error": {"message": "input file not found"}}, 404)
+
+        requests = [json.loads(line) for line in content.decode("utf-8").splitlines() if line.strip()]
+        batch_id = "batch_" + uuid.uuid4().hex[:24]
+        with self.state.lock:
+            self.state.batches[batch_id] = {"created": time.time(), "kind": "openai", "requests": requests}
+        self._openai_batch_status(batch_id)
+
+    def _openai_batch_status(self, batch_id):
+        batch = self._get_batch(batch_id)
+        if batch is None:
+            return self._send_json({"error": {"message": "batch not found"}}, 404)
+
+        output_file_id = None
+        if self.state.batch_done(batch):
+            output_file_id = "file-out-" + batch_id
+            lines = [
+                json.dumps({"custom_id": request["custom_id"],
+                            "response": {"status_code": 200, "body": deepseek_completion(request["body"])}})
+                for request in batch["requests"]
+            ]
+            with self.state.lock:
+                self.state.files.setdefault(output_file_id, ("\n".join(lines) + "\n").encode("utf-8"))
+
+        self._send_json({
+            "id": batch_id,
+            "object": "batch",
+            "status": "completed" if output_file_id else "in_progress",
+            "output_file_id": output_file_id
+        })
+
+    def _file_content(self, file_id):
+        with self.state.lock:
+            content = self.state.files.get(file_id)
+        if content is None:
+            return self._send_json({"error": {"message": "file not found"}}, 404)
+        self._send_text(content.decode("utf-8"))
+
+
+def start_server(host="127.0.0.1", port=0, **config):
+    """
+    Starts the mock server on a background thread.
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when finished
+    """
+    handler = type("Handler", (MockHandler,), {"state": MockState(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.state = handler.state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock LLM API server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch_delay", type=float, default=2.0, help='seconds before a submitted batch ends')
+    parser.add_argument("--latency", type=float, default=0.0, help='median seconds before a reply starts')
+    parser.add_argument("--latency_spread", type=float, default=0.0, help='lognormal sigma around --latency (0 = fixed)')
+    parser.add_argument("--error_rate", type=float, default=0.0, help='share of calls answered with HTTP 500')
+    parser.add_argument("--burst_every", type=float, default=0.0, help='seconds between 429 bursts (0 = none)')
+    parser.add_argument("--burst_length", type=float, default=0.0, help='seconds each 429 burst lasts')
+    parser.add_argument("--seed", type=int, default=None, help='random seed for latency and errors')
+    args = parser.parse_args()
+
+    state = MockState(batch_delay=args.batch_delay, latency=args.latency, latency_spread=args.latency_spread,
+                      error_rate=args.error_rate, burst_every=args.burst_every, burst_length=args.burst_length,
+                      seed=args.seed)
+    handler = type("Handler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Mock LLM server on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+# Throughput benchmarks for the CSV batch runner and the Assignment Validator,
+# run against the local mock server so no live API (or money) is involved.
+#
+# python3 benchmarks/run_benchmarks.py
+# python3 benchmarks/run_benchmarks.py --rows 2000 --concurrency 16 --latency 0.5 --latency_spread 0.6
+# python3 benchmarks/run_benchmarks.py --error_rate 0.02 --burst_every 10 --burst_length 1
+# python3 benchmarks/run_benchmarks.py --save before.json
+# python3 benchmarks/run_benchmarks.py --baseline before.json     (after a change)
+# python3 benchmarks/run_benchmarks.py --scenarios startup --binary Assignment_Validator/dist/Task_Validator.exe
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_llm_server import start_server
+
+try:
+    import psutil
+except ImportError:     # optional; without it peak memory is only measured where os.wait4 exists
+    psutil = None
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_SCRIPT = os.path.join(ROOT, "Carlson_scripts", "LLMs_Console.py")
+VALIDATOR_DIR = os.path.join(ROOT, "Assignment_Validator")
+FROZEN_BINARY = os.path.join(VALIDATOR_DIR, "dist", "Task_Validator.exe" if os.name == "nt" else "Task_Validator")
+HEADER_MARKER = b"ASSIGNMENT VALIDATOR"
+REGRESSION_THRESHOLD = 0.10    # a throughput drop or p95 rise beyond this is flagged
+
+
+def run_child(command, log_path, env=None):
+    """
+    Runs a command to completion with its output sent to log_path.
+
+    Returns:
+        tuple: (exit code, wall seconds, peak resident memory in MB, or None
+        where it cannot be measured)
+    """
+    started = time.monotonic()
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            code = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is kilobytes on Linux, bytes on macOS
+            peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        else:
+            peak_mb = watch_peak_mb(process)
+            code = process.wait()
+    return code, time.monotonic() - started, peak_mb
+
+
+def watch_peak_mb(process, interval=0.05):
+    """
+    Peak resident memory of a running process via psutil (Windows has no
+    os.wait4). Windows reports its own peak working set; elsewhere RSS is
+    sampled until the process exits. Returns None without psutil.
+    """
+    if psutil is None:
+        process.wait()
+        return None
+
+    peak = 0
+    try:
+        watched = psutil.Process(process.pid)
+        while process.poll() is None:
+            info = watched.memory_info()
+            peak = max(peak, getattr(info, "peak_wset", 0), info.rss)
+            time.sleep(interval)
+    except psutil.Error:
+        pass    # exited between polls
+    return peak / (1024 * 1024) if peak else None
+
+
+def latency_percentiles(metrics_path):
+    """p50/p95/p99 of per-call latency from a --metrics_out file."""
+    latencies = []
+    if os.path.exists(metrics_path):
+        with open(metrics_path, "r", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                if entry.get("latency") is not None and not entry.get("cached"):
+                    latencies.append(entry["latency"])
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "calls": 0}
+
+    latencies.sort()
+    pick = lambda fraction: latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "calls": len(latencies)}
+
+
+# ============ SCENARIOS ============
+
+def bench_csv(args, base_url, workdir):
+    """LLMs_Console.py in sync mode over a generated CSV of unique rows."""
+    input_path = os.path.join(workdir, "input.csv")
+    with open(input_path, "w", encoding="utf-8") as file:
+        file.write("text\n")
+        for index in range(args.rows):
+            file.write(f"Summarise benchmark row {index} in one sentence.\n")
+
+    metrics_path = os.path.join(workdir, "csv_metrics.jsonl")
+    command = [
+        sys.executable, CSV_SCRIPT,
+        "--input", input_path,
+        "--output", os.path.join(workdir, "output.csv"),
+        "--LLM_model", args.provider,
+        "--api_key", "benchmark",
+        "--base_url", base_url,
+        "--concurrency", str(args.concurrency),
+        "--batch_size", str(args.batch_size),
+        "--max_retries", str(args.max_retries),
+        "--no-cache",
+        "--no-dedup",
+        "--metrics_out", metrics_path,
+    ]
+    code, elapsed, peak_mb = run_child(command, os.path.join(workdir, "csv.log"))
+    return {"scenario": f"csv ({args.provider})", "units": "rows", "count": args.rows, "exit_code": code,
+            "seconds": elapsed, "per_second": args.rows / elapsed, "peak_mb": peak_mb,
+            **latency_percentiles(metrics_path)}
+
+
+def bench_validator(args, base_url, workdir):
+    """Assignment Validator --batch over generated text assignments."""
+    assignments = os.path.join(workdir, "assignments")
+    os.makedirs(assignments, exist_ok=True)
+    for index in range(args.files):
+        with open(os.path.join(assignments, f"assignment_{index:03d}.txt"), "w", encoding="utf-8") as file:
+            file.write(f"Benchmark assignment {index}. Answer every question.\n\n")
+            for number in range(1, args.questions + 1):
+                file.write(f"{number}. What is the value of item {number} in set {index}?\n")
+
+    metrics_path = os.path.join(workdir, "validator_metrics.jsonl")
+    env = dict(os.environ,
+               PYTHONPATH=os.path.join(VALIDATOR_DIR, "src"),
+               CLAUDE_BASE_URL=base_url, DEEPSEEK_BASE_URL=base_url,
+               CLAUDE_API_KEY="benchmark", DEEP_API_KEY="benchmark")
+    command = [
+        sys.executable, os.path.join(VALIDATOR_DIR, "main.py"),
+        "--batch", assignments,
+        "--workers", str(args.workers),
+        "--max-retries", str(args.max_retries),
+        "--no-cache",
+        "--metrics-out", metrics_path,
+    ]
+    code, elapsed, peak_mb = run_child(command, os.path.join(workdir, "validator.log"), env=env)
+    return {"scenario": "validator --batch", "units": "files", "count": args.files, "exit_code": code,
+            "seconds": elapsed, "per_second": args.files / elapsed, "peak_mb": peak_mb,
+            **latency_percentiles(metrics_path)}
+
+
+def time_to_header(command, env):
+    """Seconds from launch until the validator's header reaches stdout, or None if it never does."""
+    started = time.monotonic()
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, env=env)
+    seen = b""
+    try:
+        while HEADER_MARKER not in seen:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                return None
+            seen = seen[-len(HEADER_MARKER):] + chunk
+        return time.monotonic() - started
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
+
+
+def bench_startup(args, base_url, workdir):
+    """
+    Cold start of the Assignment Validator: launch to header, repeated. Runs
+    the frozen build (--binary) when it exists, otherwise main.py from source.
+    A one-file build unpacks into a fresh temp dir on every launch, so each
+    run is a cold start.
+    """
+    binary = args.binary or FROZEN_BINARY
+    if os.path.exists(binary):
+        command, label = [binary], "startup (frozen)"
+    else:
+        command, label = [sys.executable, os.path.join(VALIDATOR_DIR, "main.py")], "startup (source)"
+    env = dict(os.environ, PYTHONPATH=os.path.join(VALIDATOR_DIR, "src"),
+               CLAUDE_API_KEY="benchmark", DEEP_API_KEY="benchmark")
+
+    started = time.monotonic()
+    times = sorted(filter(None, (time_to_header(command, env) for _ in range(args.startup_runs))))
+    elapsed = time.monotonic() - started
+    pick = lambda fraction: times[min(len(times) - 1, int(fraction * len(times)))] if times else None
+    return {"scenario": label, "units": "starts", "count": len(times),
+            "exit_code": 0 if len(times) == args.startup_runs else 1,
+            "seconds": elapsed, "per_second": len(times) / elapsed, "peak_mb": None,
+            "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "calls": 0}
+
+
+SCENARIOS = {
+    "csv": bench_csv,
+    "validator": bench_validator,
+    "startup": bench_startup,
+}
+
+
+# ============ REPORT ============
+
+def _ms(value):
+    return f"{value * 1000:.0f}" if value is not None else "-"
+
+
+def _mb(value):
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def print_report(results, baseline=None):
+    print(f"\n{'scenario':<22} {'count':>7} {'secs':>8} {'per sec':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak MB':>8}  exit")
+    for result in results:
+        print(f"{result['scenario']:<22} {result['count']:>7} {result['seconds']:>8.2f} "
+              f"{result['per_second']:>9.1f} {_ms(result['p50']):>8} {_ms(result['p95']):>8} "
+              f"{_ms(result['p99']):>8} {_mb(result['peak_mb']):>8}  {result['exit_code']}")
+
+    if not baseline:
+        return 0
+
+    regressions = 0
+    before = {result["scenario"]: result for result in baseline}
+    print("\nAgainst baseline:")
+    for result in results:
+        old = before.get(result["scenario"])
+        if old is None:
+            continue
+        throughput = result["per_second"] / old["per_second"] - 1
+        line = f"  {result['scenario']:<22} throughput {throughput:+.1%}"
+        flagged = throughput < -REGRESSION_THRESHOLD
+        if result["p95"] and old.get("p95"):
+            p95 = result["p95"] / old["p95"] - 1
+            line += f", p95 {p95:+.1%}"
+            flagged = flagged or p95 > REGRESSION_THRESHOLD
+        if flagged:
+            regressions += 1
+            line += "  << REGRESSION"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks against the mock LLM server")
+    parser.add_argument("--scenarios", type=str, default="csv,validator,startup", help=f"comma list of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--provider", type=str, default="Claude", help='provider the CSV runner uses')
+    parser.add_argument("--rows", type=int, default=500, help='CSV rows')
+    parser.add_argument("--concurrency", type=int, default=8, help='CSV runner requests in flight')
+    parser.add_argument("--batch_size", type=int, default=50, help='CSV runner batch size')
+    parser.add_argument("--files", type=int, default=20, help='validator assignments')
+    parser.add_argument("--questions", type=int, default=10, help='questions per assignment')
+    parser.add_argument("--workers", type=int, default=4, help='validator files in flight')
+    parser.add_argument("--startup_runs", type=int, default=10, help='validator launches timed to the header')
+    parser.add_argument("--binary", type=str, default=None, help='frozen Task_Validator to time (default: dist/ build)')
+    parser.add_argument("--max_retries", type=int, default=5, help='retries passed to both tools')
+    parser.add_argument("--latency", type=float, default=0.2, help='mock median latency, seconds')
+    parser.add_argument("--latency_spread", type=float, default=0.4, help='mock lognormal sigma')
+    parser.add_argument("--error_rate", type=float, default=0.0, help='mock share of HTTP 500 replies')
+    parser.add_argument("--burst_every", type=float, default=0.0, help='mock seconds between 429 bursts')
+    parser.add_argument("--burst_length", type=float, default=0.0, help='mock seconds per 429 burst')
+    parser.add_argument("--seed", type=int, default=1, help='mock random seed')
+    parser.add_argument("--save", type=str, default=None, help='write results as JSON')
+    parser.add_argument("--baseline", type=str, default=None, help='JSON from an earlier --save to compare against')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(unknown)}")
+        return 2
+
+    server, base_url = start_server(latency=args.latency, latency_spread=args.latency_spread,
+                                    error_rate=args.error_rate, burst_every=args.burst_every,
+                                    burst_length=args.burst_length, seed=args.seed)
+    print(f"Mock LLM server on {base_url}")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="llm_bench_") as workdir:
+            for name in names:
+                print(f"Running {name}...")
+                result = SCENARIOS[name](args, base_url, workdir)
+                log_path = os.path.join(workdir, f"{name}.log")
+                if result["exit_code"] != 0 and os.path.exists(log_path):
+                    with open(log_path, "r", errors="replace") as log:
+                        tail = log.read()[-2000:]
+                    print(f"  {name} exited with {result['exit_code']}; end of its output:\n{tail}")
+                elif result["exit_code"] != 0:
+                    print(f"  {name}: only {result['count']} run(s) reached the header")
+                results.append(result)
+    finally:
+        server.shutdown()
+
+    print(f"Mock server: {server.state.stats['calls']} calls, {server.state.stats['throttled']} throttled, "
+          f"{server.state.stats['errors']} errors")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    regressions = print_report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())